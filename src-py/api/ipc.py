@@ -1,3 +1,5 @@
+import sys
+import threading
 from time import time
 from pydantic_core import to_json
 
@@ -7,8 +9,19 @@ from models.messages import (
     ProgressMessage,
     StatusType,
     StepType,
+    TranscriptionMessage,
 )
 
+# Messages are sent from several threads, every line has to reach stdout whole
+stdout_lock = threading.Lock()
+
+
+def write_line(line: str):
+    """Writes a line to stdout in a single write, so lines from threads never interleave"""
+    with stdout_lock:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
 
 def print_progress(
     step: StepType, status: StatusType, timestamp=time(), request_id: str | None = None
@@ -32,10 +45,60 @@ def print_message(
 ):
     message = message_data.model_dump_json()
     logger.debug(message)
-    print(message, flush=True)
+    write_line(message)
 
 
 def print_nested_model(data: dict):
     model_str = to_json(data).decode("utf-8")
     logger.debug(model_str)
-    print(model_str, flush=True)
+    write_line(model_str)
+
+
+class StreamCoalescer:
+    """
+    Batches streamed text into TranscriptionMessage frames.
+
+    Sending one message per token costs a JSON encode, a log line and a
+    flushed write each, which saturates stdout and the Electron parser at
+    high token rates. Text is collected until the frame interval has passed
+    or the frame is full; the first chunk is sent right away so the time to
+    the first token is unchanged. Frames carry a sequence number and the
+    remaining text is flushed when the stream is closed.
+    """
+
+    FRAME_INTERVAL = 0.033  # seconds, about 30 frames per second
+    MAX_FRAME_CHARACTERS = 512
+
+    def __init__(self):
+        self.chunks: list[str] = []
+        self.characters = 0
+        self.sequence = 0
+        self.last_flush = 0.0
+
+    def write(self, text: str):
+        self.chunks.append(text)
+        self.characters += len(text)
+        if (
+            time() - self.last_flush >= self.FRAME_INTERVAL
+            or self.characters >= self.MAX_FRAME_CHARACTERS
+        ):
+            self.flush()
+
+    def flush(self):
+        if not self.chunks:
+            return
+        print_message(
+            TranscriptionMessage(
+                transcription="".join(self.chunks), sequence=self.sequence
+            )
+        )
+        self.sequence += 1
+        self.chunks = []
+        self.characters = 0
+        self.last_flush = time()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.flush()
@@ -1,3 +1,6 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
 from loguru import logger
 
 from api.ipc import print_message, print_nested_model, print_progress
@@ -11,6 +14,7 @@ from models.commands import (
 )
 from models.db import (
     Mode,
+    ResultTimingBase,
 )
 from models.messages import (
     AudioLevelMessage,
@@ -20,17 +24,29 @@ from models.messages import (
     ModeResponse,
     ModesResponse,
     ResultsResponse,
+    SegmentMessage,
     StatusMessage,
     TextReplacementsResponse,
+    VoiceModelStateType,
     VoiceModelsResponse,
 )
 from services.audio.recorder import AudioRecorder
 from services.audio.compressor import Compressor
+from services.audio.devices import device_registry
+from services.ai.language import update_language_prior
 from services.ai.transcriber import LocalTranscriber
+from services.ai.live import LiveTranscriber
 from services.ai.formatter import AIProcessor
+from services.ai.pipeline import LanguageModelPipeline
 from services.system.window_detector import WindowDetector
 from services.storage.database import DatabaseManager
+from services.storage.transcription_cache import transcription_cache
 from core.workflow import TranscriptionWorkflow
+from utils.environment import (
+    get_preroll_ms,
+    is_armed_recording_enabled,
+    is_live_transcription_enabled,
+)
 
 
 class Controller:
@@ -38,57 +54,257 @@ class Controller:
         print_progress("init", "start")
 
         self.recorder = AudioRecorder()
+        if is_armed_recording_enabled():
+            try:
+                self.recorder.arm(get_preroll_ms())
+            except Exception as e:
+                logger.error(f"Could not arm the input stream: {e}")
         self.compressor = Compressor()
         self.database_manager = DatabaseManager()
         self.window_detector = WindowDetector()
         self.workflow = TranscriptionWorkflow(self)
 
+        self.live_transcriber: LiveTranscriber | None = None
+        self.language_model_pipeline: LanguageModelPipeline | None = None
+        # Stage timings of the running workflow
+        self.timing = ResultTimingBase()
+        self.preload_executor = ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="preload"
+        )
+        self.preloads: dict[str, Future] = {}
+
         self.status: ControllerStatusType = "idle"
         self.mode: Mode = self.database_manager.get_active_mode()
         print_progress("init", "complete")
 
-    def update_status(self, status: ControllerStatusType):
+    def update_status(
+        self,
+        status: ControllerStatusType,
+        voice_model_state: VoiceModelStateType | None = None,
+    ):
         self.status = status
-        print_message(StatusMessage(status=status))
+        print_message(StatusMessage(status=status, voice_model_state=voice_model_state))
 
-    def stop_recording(self):
+    def stop_recording(self, save: bool = True):
         if self.recorder.recording:
-            self.recorder.stop()
+            self.recorder.stop(save=save)
         return self.recorder.get_file_path()
 
-    def compress_recording(self, file_path: str):
-        self.update_status("compressing")
-        compressed_file = self.compressor.compress(file_path)
-        return compressed_file
+    def prepare_recording(self):
+        audio = self.recorder.get_audio()
+        if audio is None or self.recorder.audio_buffer is None:
+            return None
+        return self.compressor.prepare(audio, self.recorder.audio_buffer.samplerate)
+
+    def archive_recording(self, save: bool):
+        """Starts encoding the archive copy of the recording in the background"""
+        return self.compressor.compress_in_background(
+            self.recorder.get_file_path(),
+            write_source=self.recorder.save_audio if save else None,
+        )
 
-    def transcribe_audio(self, file_path: str):
-        self.update_status("loading_voice_model")
+    def create_transcriber(self):
         global_text_replacements = list(
             self.database_manager.get_global_text_replacements()
         )
-        self.transcriber = LocalTranscriber(self.mode, global_text_replacements)
-        self.transcriber.load_model()
+        language_prior = (
+            self.database_manager.get_language_prior(self.mode.id)
+            if self.mode.voice_language == "auto"
+            else None
+        )
+        return LocalTranscriber(self.mode, global_text_replacements, language_prior)
+
+    def update_language_prior(self, transcriber: LocalTranscriber):
+        """Learns the language of auto-language modes from the last transcription"""
+        if self.mode.voice_language != "auto" or not transcriber.language_detection:
+            return
+        self.database_manager.save_language_prior(
+            update_language_prior(
+                transcriber.language_prior,
+                self.mode.id,
+                transcriber.language_detection,
+            )
+        )
+
+    def start_live_transcription(self):
+        self.live_transcriber = LiveTranscriber(
+            self.create_transcriber(), self.recorder
+        )
+        self.live_transcriber.start()
 
-        self.update_status("transcribing")
-        transcription = self.transcriber.transcribe_audio(file_path)
+    def finish_live_transcription(self):
+        assert self.live_transcriber is not None
+        live_transcriber, self.live_transcriber = self.live_transcriber, None
+        self.update_status(
+            "transcribing", live_transcriber.transcriber.get_model_state()
+        )
+        start_time = time.time()
+        try:
+            transcription = live_transcriber.finish()
+        finally:
+            live_transcriber.transcriber.unload_model()
+        self.timing.decode = time.time() - start_time
+        self.update_language_prior(live_transcriber.transcriber)
+        logger.info(f"Transcription: {transcription}")
+        return transcription
+
+    def cancel_live_transcription(self):
+        if self.live_transcriber:
+            self.live_transcriber.cancel()
+            self.live_transcriber.transcriber.unload_model()
+            self.live_transcriber = None
+
+    def load_transcriber(self, warm_up: bool = False):
+        transcriber = self.create_transcriber()
+        transcriber.load_model(warm_up)
+        return transcriber
+
+    def load_processor(self):
+        processor = AIProcessor(self.mode)
+        processor.load_model()
+        return processor
+
+    def start_preloads(self):
+        """Starts loading the models of the active mode while the user speaks"""
+        # Release models preloaded for a workflow that ended early
+        self.cancel_preloads()
+        if not self.live_transcriber:
+            # Warms up while the user speaks, unless the dictation ends first
+            self.preloads["voice"] = self.preload_executor.submit(
+                self.load_transcriber, True
+            )
+        if (
+            self.mode.use_language_model
+            and self.mode.language_model
+            and self.mode.prompt
+        ):
+            self.preloads["language"] = self.preload_executor.submit(
+                self.load_processor
+            )
+
+    def take_preload(self, name: str):
+        """Waits for a preloaded model, returning None if it was not preloaded or failed"""
+        future = self.preloads.pop(name, None)
+        if not future:
+            return None
+        try:
+            return future.result()
+        except Exception as e:
+            logger.error(f"Preloading the {name} model failed: {e}")
+            return None
+
+    def cancel_preload(self, name: str):
+        future = self.preloads.pop(name, None)
+        if not future:
+            return
+        if not future.cancel():
+            # Already loading, release the model once it is loaded
+            future.add_done_callback(self.release_preload)
+        logger.debug(f"Cancelled {name} model preload")
+
+    def cancel_preloads(self):
+        for name in list(self.preloads):
+            self.cancel_preload(name)
+
+    def release_preload(self, future: Future):
+        if future.exception():
+            return
+        future.result().unload_model()
+
+    def start_language_model_pipeline(self):
+        """Loads the language model and prefills it while the audio is decoded"""
+        if not (
+            self.mode.use_language_model
+            and self.mode.language_model
+            and self.mode.prompt
+        ):
+            return
+        self.language_model_pipeline = LanguageModelPipeline(
+            lambda: self.take_preload("language") or self.load_processor()
+        )
+        self.language_model_pipeline.start()
+
+    def cancel_language_model_pipeline(self):
+        if self.language_model_pipeline:
+            self.language_model_pipeline.cancel()
+            self.language_model_pipeline = None
+
+    def handle_segment(self, segment: SegmentMessage):
+        print_message(segment)
+        if self.language_model_pipeline:
+            self.language_model_pipeline.put(segment)
+
+    def transcribe_audio(self, audio: str | np.ndarray):
+        # Looked up before the voice model is loaded, a hit does not need it
+        transcriber = self.create_transcriber()
+        cache_key = transcriber.get_cache_key(audio)
+        cached = transcription_cache.get(cache_key) if cache_key else None
+        start_time = time.time()
+        if cached:
+            logger.info("Transcription cached, skipping the voice model")
+            self.cancel_preload("voice")
+        else:
+            self.update_status("loading_voice_model")
+            preloaded = self.take_preload("voice")
+            if preloaded:
+                transcriber = preloaded
+            else:
+                transcriber.load_model()
+        self.transcriber = transcriber
+        self.timing.voice_model_load = time.time() - start_time
+
+        self.update_status("transcribing", self.transcriber.get_model_state())
+        start_time = time.time()
+        transcription = self.transcriber.transcribe_audio(
+            audio, on_segment=self.handle_segment, cache_key=cache_key, cached=cached
+        )
+        self.timing.decode = time.time() - start_time
+        if self.transcriber.language_detection:
+            self.timing.language_detection = (
+                self.transcriber.language_detection.duration
+            )
         logger.info(f"Transcription: {transcription}")
         self.transcriber.unload_model()
+        self.update_language_prior(self.transcriber)
         return transcription
 
     def process_transcription(self, transcription: str):
         assert self.mode.language_model is not None
         assert self.mode.prompt is not None
         self.update_status("loading_language_model")
-        self.processor = AIProcessor(self.mode)
-        self.processor.load_model()
+        start_time = time.time()
+        processor = None
+        if self.language_model_pipeline:
+            processor = self.language_model_pipeline.finish()
+            self.language_model_pipeline = None
+        self.processor = (
+            processor or self.take_preload("language") or self.load_processor()
+        )
+        self.timing.language_model_load = time.time() - start_time
 
         self.update_status("generating_ai_result")
         ai_result = self.processor.process(transcription)
+        self.record_generation_timing(self.processor)
         logger.info(f"AI Result: {ai_result}")
         self.processor.unload_model()
 
         return ai_result
 
+    def record_generation_timing(self, processor: AIProcessor):
+        response = processor.last_response
+        if not response:
+            return
+        if response.prompt_eval_duration:
+            self.timing.prompt_eval = response.prompt_eval_duration / 10**9
+        if response.eval_duration:
+            self.timing.generation = response.eval_duration / 10**9
+        self.timing.prompt_tokens = response.prompt_eval_count
+        self.timing.eval_tokens = response.eval_count
+        if response.eval_count and response.eval_duration:
+            self.timing.tokens_per_second = response.eval_count / (
+                response.eval_duration / 10**9
+            )
+
     def handle_toggle(self):
         self.mode = self.database_manager.get_active_mode()
         if self.status == "idle" or self.status == "result":
@@ -103,6 +319,9 @@ class Controller:
                     # self.formatter.set_active_window(ActiveWindowContext(**window_info))
                     pass
             self.recorder.start()
+            if is_live_transcription_enabled() and not self.recorder.writer:
+                self.start_live_transcription()
+            self.start_preloads()
             self.update_status("recording")
         elif self.status == "recording":
             self.workflow.execute()
@@ -112,7 +331,9 @@ class Controller:
     def handle_cancel(self):
         if self.status == "recording":
             self.recorder.interrupt_recording()
-            self.recorder = AudioRecorder()
+            self.cancel_live_transcription()
+            self.cancel_preloads()
+            self.recorder.reset()
             print_message(AudioLevelMessage(audio_level=0))
             self.update_status("idle")
         elif self.status == "result":
@@ -152,6 +373,8 @@ class Controller:
         # TODO: what about select mode?
 
         elif request.channel == CHANNELS.FETCH_ALL_DEVICES:
+            # Pick up hotplugged devices before answering, skipped while a stream is open
+            device_registry.rescan_if_stale()
             devices = self.recorder.get_devices()
             print_message(DevicesResponse(data=devices, id=request.id))
 
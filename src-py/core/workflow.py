@@ -1,17 +1,20 @@
+import os
 import time
 from loguru import logger
-from models.db import Result
+from models.db import Result, ResultTiming, ResultTimingBase
 from api.ipc import print_nested_model
 from utils.serialization import dump_instance
 from models.messages import ResultMessage
+from services.ai.decoding import describe_decoding_profile
+from utils.environment import is_in_memory_audio_enabled
 
 
 class TranscriptionWorkflow:
     """
     Coordinates the end-to-end transcription workflow:
     1. Recording audio
-    2. Compressing audio
-    3. Transcribing audio
+    2. Compressing audio for the archive (in the background)
+    3. Transcribing audio, while the language model is loaded and prefilled
     4. Processing with language model
     5. Saving results
     """
@@ -35,26 +38,57 @@ class TranscriptionWorkflow:
         logger.info(f"Executing transcription workflow, mode: {self.controller.mode}")
         processing_start_time = time.time()
 
+        live = self.controller.live_transcriber is not None
+        # Spilled recordings are only available as a file
+        in_memory = live or (
+            is_in_memory_audio_enabled() and not self.controller.recorder.writer
+        )
+
+        timing = self.controller.timing = ResultTimingBase()
+
         # Step 1: Stop recording
-        recording_file = self.controller.stop_recording()
+        start_time = time.time()
+        recording_file = self.controller.stop_recording(save=not in_memory)
+        timing.stop = time.time() - start_time
         if not recording_file:
             logger.warning("Recording file not found")
             self.controller.update_status("idle")
             return False
 
-        # Step 2: Compress recording
-        compressed_file = self.controller.compress_recording(recording_file)
-        if not compressed_file:
-            logger.warning("Compression failed or file not found")
-            self.controller.update_status("idle")
-            return False
+        # Step 2: Encode the archive copy in parallel with the rest of the workflow
+        archive = self.controller.archive_recording(save=in_memory)
 
-        # Step 3: Transcribe audio
-        transcription = self.controller.transcribe_audio(compressed_file)
+        if live:
+            # Step 3: Only the audio after the last live chunk is left
+            transcription = self.controller.finish_live_transcription()
+        else:
+            # Step 3: Transcribe the in-memory audio or the recorded file
+            if in_memory:
+                audio = self.controller.prepare_recording()
+                if audio is None:
+                    logger.warning("No audio recorded")
+                    self.controller.update_status("idle")
+                    self.controller.compressor.cleanup(archive)
+                    return False
+            else:
+                if not os.path.exists(recording_file):
+                    logger.warning("No audio recorded")
+                    self.controller.update_status("idle")
+                    self.controller.compressor.cleanup(archive)
+                    return False
+                audio = recording_file
+            # Overlap loading and prefilling the language model with decoding
+            self.controller.start_language_model_pipeline()
+            try:
+                transcription = self.controller.transcribe_audio(audio)
+            except Exception:
+                self.controller.cancel_language_model_pipeline()
+                raise
         if not transcription:
             logger.warning("Transcription empty or failed")
+            self.controller.cancel_language_model_pipeline()
             self.controller.update_status("idle")
-            self.controller.compressor.cleanup()
+            self.controller.compressor.cleanup(archive)
             return False
 
         ai_result = None
@@ -70,13 +104,23 @@ class TranscriptionWorkflow:
             mode_id=self.controller.mode.id,
             duration=self.controller.recorder.duration,
             processing_time=time.time() - processing_start_time,
+            decoding_profile=describe_decoding_profile(self.controller.mode),
+        )
+        start_time = time.time()
+        self.controller.database_manager.save_result(
+            result, lambda: self.controller.compressor.get_archive_files(archive)
         )
-        self.controller.database_manager.save_result(result)
         self.controller.compressor.cleanup()
+        timing.save = time.time() - start_time
+        timing.compress = self.controller.compressor.last_archive_time
+        self.controller.database_manager.save_result_timing(
+            ResultTiming(result_id=result.id, **timing.model_dump())
+        )
+        logger.info(f"Stage timing: {timing}")
 
         # Step 6: Return result
         self.controller.update_status("result")
-        response = ResultMessage(result=result, updateKind="result")
+        response = ResultMessage(result=result, timing=timing, updateKind="result")
         dumped_response = response.model_dump()
         dumped_response["result"] = dump_instance(result.create_instance())
         print_nested_model(data=dumped_response)
@@ -1,4 +1,5 @@
 import os
+import re
 import time
 from typing import Literal, Optional, List
 from uuid import uuid4, UUID
@@ -27,6 +28,8 @@ language_name_map: dict[LanguageType, str] = {
 
 VoiceModelNameType = Literal["large-v3-turbo", "large-v3", "distil-large-v3"]
 
+DecodingProfileType = Literal["fast", "balanced", "accurate", "custom"]
+
 
 class ModeBase(SQLModel):
     name: str = Field(index=True)
@@ -36,6 +39,14 @@ class ModeBase(SQLModel):
     translate_to_english: bool = False
     use_language_model: bool = False
     record_system_audio: bool = False
+    decoding_profile: DecodingProfileType = Field(sa_type=String, default="balanced")
+    # Only used by the custom decoding profile
+    beam_size: int = 5
+    best_of: int = 5
+    patience: float = 1.0
+    condition_on_previous_text: bool = True
+    vad_threshold: float = 0.5
+    vad_min_silence_duration_ms: int = 2000
     model_config = ConfigDict(
         from_attributes=True,
     )  # type: ignore
@@ -89,6 +100,13 @@ class Mode(ModeBase, table=True):
                 "translate_to_english": self.translate_to_english,
                 "use_language_model": self.use_language_model,
                 "record_system_audio": self.record_system_audio,
+                "decoding_profile": self.decoding_profile,
+                "beam_size": self.beam_size,
+                "best_of": self.best_of,
+                "patience": self.patience,
+                "condition_on_previous_text": self.condition_on_previous_text,
+                "vad_threshold": self.vad_threshold,
+                "vad_min_silence_duration_ms": self.vad_min_silence_duration_ms,
                 "text_replacements": [tr.model_dump() for tr in self.text_replacements],
                 "voice_model": self.voice_model.model_dump(),
                 "language_model": self.language_model.model_dump()
@@ -193,6 +211,8 @@ class Example(ExampleBase, table=True):
 class TextReplacementBase(SQLModel):
     original_text: str
     replacement_text: str
+    whole_word: bool = False
+    case_insensitive: bool = False
 
     model_config = ConfigDict(
         from_attributes=True,
@@ -205,10 +225,19 @@ class TextReplacement(TextReplacementBase, table=True):
     mode_id: UUID | None = Field(foreign_key="mode.id")
     mode: Mode | None = Relationship(back_populates="text_replacements")
 
+    def get_pattern(self) -> str:
+        """Returns the regular expression matching the original text"""
+        pattern = re.escape(self.original_text)
+        if self.whole_word:
+            pattern = rf"(?<!\w){pattern}(?!\w)"
+        if self.case_insensitive:
+            pattern = f"(?i:{pattern})"
+        return pattern
+
     def apply_replacement(self, text: str) -> str:
         if not self.original_text or not self.replacement_text:
             return text
-        return text.replace(self.original_text, self.replacement_text)
+        return re.sub(self.get_pattern(), lambda _: self.replacement_text, text)
 
 
 class ResultBase(SQLModel):
@@ -217,6 +246,7 @@ class ResultBase(SQLModel):
     ai_result: str | None
     duration: float
     processing_time: float
+    decoding_profile: str | None = None
 
     model_config = ConfigDict(
         from_attributes=True,
@@ -247,6 +277,7 @@ class Result(ResultBase, table=True):
                 "ai_result": self.ai_result,
                 "duration": self.duration,
                 "processing_time": self.processing_time,
+                "decoding_profile": self.decoding_profile,
                 "mode": dump_instance(self.mode.create_instance())
                 if self.mode
                 else None,
@@ -256,6 +287,45 @@ class Result(ResultBase, table=True):
         return result_instance  # type: ignore[return-value]
 
 
+class ResultTimingBase(SQLModel):
+    """Seconds spent in each stage of the workflow that produced a result"""
+
+    stop: float | None = None
+    compress: float | None = None
+    voice_model_load: float | None = None
+    decode: float | None = None
+    language_detection: float | None = None
+    language_model_load: float | None = None
+    prompt_eval: float | None = None
+    generation: float | None = None
+    save: float | None = None
+    prompt_tokens: int | None = None
+    eval_tokens: int | None = None
+    tokens_per_second: float | None = None
+
+    model_config = ConfigDict(
+        from_attributes=True,
+    )  # type: ignore
+
+
+class ResultTiming(ResultTimingBase, table=True):
+    result_id: UUID = Field(foreign_key="result.id", primary_key=True)
+
+
+class LanguagePrior(SQLModel, table=True):
+    """The language a mode in auto mode is usually spoken in, learned from detection"""
+
+    mode_id: UUID = Field(foreign_key="mode.id", primary_key=True)
+    language: str
+    # Moving average of the detection probability for this language
+    confidence: float = 0.0
+    observations: int = 0
+    # Dictations transcribed with the prior since detection last ran
+    since_verified: int = 0
+    needs_check: bool = False
+    updated_at: float = Field(default_factory=time.time)
+
+
 class ApplicationContext(BaseModel):
     name: str
     title: str
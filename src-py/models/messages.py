@@ -13,6 +13,7 @@ from models.db import (
     LanguageModel,
     Mode,
     Result,
+    ResultTimingBase,
     TextReplacement,
     VoiceModel,
 )
@@ -46,6 +47,8 @@ class ExceptionMessage(BaseUpdateMessage):
 
 class AudioLevelMessage(BaseUpdateMessage):
     audio_level: float
+    rms_db: float | None = None
+    peak_db: float | None = None
     updateKind: Literal["audio_level"] = "audio_level"
 
 
@@ -67,21 +70,39 @@ ControllerStatusType = Literal[
 ]
 
 
+VoiceModelStateType = Literal["cold", "warm"]
+
+
 class StatusMessage(BaseUpdateMessage):
     status: ControllerStatusType
+    # Whether the voice model has already run its warm-up inference
+    voice_model_state: VoiceModelStateType | None = None
     updateKind: Literal["status"] = "status"
 
 
 class ResultMessage(BaseUpdateMessage):
     result: Result
+    timing: ResultTimingBase | None = None
     updateKind: Literal["result"] = "result"
 
 
 class TranscriptionMessage(BaseUpdateMessage):
     transcription: str
+    # Position of the frame within a coalesced stream
+    sequence: int | None = None
     updateKind: Literal["transcription"] = "transcription"
 
 
+class SegmentMessage(BaseUpdateMessage):
+    """A transcribed segment, sent as soon as it is decoded"""
+
+    text: str
+    start: float  # seconds from the start of the recording
+    end: float
+    index: int
+    updateKind: Literal["segment"] = "segment"
+
+
 # A message from the Python process to the Electron process that was not explicitly requested.
 Update = Annotated[
     Union[
@@ -92,6 +113,7 @@ Update = Annotated[
         StatusMessage,
         ResultMessage,
         TranscriptionMessage,
+        SegmentMessage,
     ],
     Field(discriminator="updateKind"),
 ]
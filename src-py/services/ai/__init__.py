@@ -3,6 +3,17 @@ AI services for LocalFlow.
 
 This package contains:
 - Transcriber: Handles speech-to-text conversion using faster-whisper
+- ReplacementEngine: Applies all text replacements of a mode in a single pass
+- Language priors: Skip language detection for modes that are always spoken in one language
+- Decoding profiles: Per-mode faster-whisper options trading latency for accuracy
+- ComputePlanner: Chooses device, compute type and threads for voice models
+- VoiceModelCache: Keeps loaded voice models resident between dictations
+- LiveTranscriber: Transcribes finished chunks while a recording is in progress
+- OllamaClient: Pooled, long-lived connection to the local Ollama API
+- LanguageModelKeepAlive: Keeps language models loaded in Ollama between dictations
+- PromptPrefixCache: Keeps system prompts byte-stable so Ollama reuses their evaluation
+- ExampleSelector: Picks the few-shot examples most relevant to a transcription within a token budget
 - AIProcessor: Handles text processing using language models via ollama
+- LanguageModelPipeline: Loads and prefills the language model while audio is decoded
 - Prompt utilities: Handles prompt generation for language models
 """
@@ -0,0 +1,256 @@
+import gc
+import json
+import os
+import platform
+import threading
+import time
+from typing import Literal
+import ctranslate2
+import numpy as np
+from faster_whisper import WhisperModel
+from faster_whisper.audio import pad_or_trim
+from faster_whisper.tokenizer import Tokenizer
+from loguru import logger
+from pydantic import BaseModel
+from models.db import VoiceModel
+from services.audio.processing import WHISPER_SAMPLE_RATE
+from utils.hardware import get_available_memory_mb
+from utils.paths import get_user_data_path
+
+# CPU compute types from fastest to most precise
+CPU_COMPUTE_TYPES = ["int8", "int8_float32", "float32"]
+CUDA_COMPUTE_TYPES = ["float16", "int8_float16", "float32"]
+# Memory footprint relative to float16, which VoiceModel.size is measured in
+COMPUTE_TYPE_SCALE = {
+    "int8": 0.5,
+    "int8_float32": 0.5,
+    "int8_float16": 0.5,
+    "float32": 2,
+}
+
+
+def get_compute_size_mb(voice_model: VoiceModel, compute_type: str) -> int:
+    """Returns the memory a voice model takes up with the given compute type"""
+    return int(voice_model.size * COMPUTE_TYPE_SCALE.get(compute_type, 1))
+
+
+class HostInfo(BaseModel):
+    platform: str
+    machine: str
+    cpu_count: int
+    cuda_devices: int
+    cpu_compute_types: list[str]
+    cuda_compute_types: list[str]
+    available_memory_mb: int | None
+
+    @property
+    def fingerprint(self) -> str:
+        return f"{self.platform}-{self.machine}-{self.cpu_count}-{self.cuda_devices}"
+
+
+class ComputePlan(BaseModel):
+    voice_model: str
+    device: Literal["cuda", "cpu"]
+    compute_type: str
+    cpu_threads: int
+    num_workers: int
+    real_time_factor: float | None = None
+
+
+def probe_host() -> HostInfo:
+    cuda_devices = ctranslate2.get_cuda_device_count()
+    return HostInfo(
+        platform=platform.system(),
+        machine=platform.machine(),
+        cpu_count=os.cpu_count() or 1,
+        cuda_devices=cuda_devices,
+        cpu_compute_types=sorted(ctranslate2.get_supported_compute_types("cpu")),
+        cuda_compute_types=(
+            sorted(ctranslate2.get_supported_compute_types("cuda"))
+            if cuda_devices
+            else []
+        ),
+        available_memory_mb=get_available_memory_mb(),
+    )
+
+
+class ComputePlanner:
+    """
+    Chooses the device, compute type and thread counts for each voice model.
+
+    The host is probed for CUDA devices, the compute types CTranslate2
+    supports on it (which reflect the available instruction sets), its core
+    count and free memory. On CPU-only hosts the candidate compute types are
+    benchmarked the first time a model is used, then the fastest one with
+    two thread counts, and the plan with the best real-time factor is
+    persisted to the user data directory.
+
+    The benchmark does the same work for every candidate: one encoder pass
+    over a 30 s window and a beam search of a fixed number of tokens, with
+    the end of text token suppressed. Transcribing a clip instead would time
+    however much text a plan happens to decode.
+    """
+
+    CALIBRATION_SECONDS = 30  # the encoder always processes a full window
+    CALIBRATION_TOKENS = 64
+    # Bumped when calibration changes, so plans measured differently are redone
+    CALIBRATION_VERSION = 2
+    MAX_CANDIDATES = 3
+
+    def __init__(self):
+        self.plans_file = os.path.join(get_user_data_path(), "compute_plans.json")
+        self.lock = threading.Lock()
+        self.host: HostInfo | None = None
+        self.plans: dict[str, ComputePlan] = {}
+
+    def get_host(self) -> HostInfo:
+        if not self.host:
+            self.host = probe_host()
+            logger.info(f"Host: {self.host}")
+        return self.host
+
+    def get_plan(self, voice_model: VoiceModel) -> ComputePlan:
+        with self.lock:
+            host = self.get_host()
+            plan_key = (
+                f"{voice_model.name}@{host.fingerprint}#{self.CALIBRATION_VERSION}"
+            )
+            if not self.plans:
+                self.load_plans()
+            if plan_key not in self.plans:
+                self.plans[plan_key] = self.create_plan(voice_model, host)
+                self.save_plans()
+            return self.plans[plan_key]
+
+    def create_plan(self, voice_model: VoiceModel, host: HostInfo) -> ComputePlan:
+        if host.cuda_devices:
+            compute_type = next(
+                (t for t in CUDA_COMPUTE_TYPES if t in host.cuda_compute_types),
+                "default",
+            )
+            return ComputePlan(
+                voice_model=voice_model.name,
+                device="cuda",
+                compute_type=compute_type,
+                cpu_threads=0,
+                num_workers=1,
+            )
+
+        candidates = [
+            ComputePlan(
+                voice_model=voice_model.name,
+                device="cpu",
+                compute_type=compute_type,
+                # CTranslate2 scales best with physical cores, assume two threads each
+                cpu_threads=max(1, host.cpu_count // 2),
+                num_workers=1,
+            )
+            for compute_type in CPU_COMPUTE_TYPES
+            if compute_type in host.cpu_compute_types
+            and self.fits_in_memory(voice_model, compute_type, host)
+        ][: self.MAX_CANDIDATES]
+        if not candidates:
+            logger.warning(f"No CPU compute type fits {voice_model.name}, using int8")
+            return ComputePlan(
+                voice_model=voice_model.name,
+                device="cpu",
+                compute_type="int8",
+                cpu_threads=max(1, host.cpu_count // 2),
+                num_workers=1,
+            )
+        if len(candidates) > 1:
+            for candidate in candidates:
+                candidate.real_time_factor = self.calibrate(candidate)
+        best = self.get_fastest(candidates)
+        if host.cpu_count > 2:
+            # Hyperthreads help some hosts and compute types, measure all logical cores too
+            threaded = best.model_copy(update={"cpu_threads": host.cpu_count})
+            if best.real_time_factor is None:
+                best.real_time_factor = self.calibrate(best)
+            threaded.real_time_factor = self.calibrate(threaded)
+            best = self.get_fastest([best, threaded])
+        return best
+
+    def get_fastest(self, candidates: list[ComputePlan]) -> ComputePlan:
+        return min(
+            candidates,
+            key=lambda plan: (
+                plan.real_time_factor
+                if plan.real_time_factor is not None
+                else float("inf")
+            ),
+        )
+
+    def fits_in_memory(
+        self, voice_model: VoiceModel, compute_type: str, host: HostInfo
+    ) -> bool:
+        if host.available_memory_mb is None:
+            return True
+        return get_compute_size_mb(voice_model, compute_type) < host.available_memory_mb
+
+    def calibrate(self, plan: ComputePlan) -> float | None:
+        """Returns the real-time factor of a plan on a fixed amount of work"""
+        try:
+            model = WhisperModel(
+                plan.voice_model,
+                device=plan.device,
+                compute_type=plan.compute_type,
+                cpu_threads=plan.cpu_threads,
+                num_workers=plan.num_workers,
+                local_files_only=True,
+            )
+            samples = self.CALIBRATION_SECONDS * WHISPER_SAMPLE_RATE
+            audio = np.random.default_rng(0).normal(0, 0.05, samples)
+            features = pad_or_trim(model.feature_extractor(audio.astype(np.float32)))
+            tokenizer = Tokenizer(
+                model.hf_tokenizer,
+                model.model.is_multilingual,
+                task="transcribe",
+                language="en",
+            )
+            prompt = list(tokenizer.sot_sequence_including_notimestamps)
+            start_time = time.time()
+            encoder_output = model.encode(features)
+            model.model.generate(
+                encoder_output,
+                [prompt],
+                beam_size=5,
+                max_length=len(prompt) + self.CALIBRATION_TOKENS,
+                suppress_blank=False,
+                suppress_tokens=[tokenizer.eot],
+            )
+            real_time_factor = (time.time() - start_time) / self.CALIBRATION_SECONDS
+            del model
+            logger.info(
+                f"Calibrated {plan.voice_model} {plan.compute_type} with "
+                f"{plan.cpu_threads} threads: RTF {real_time_factor:.3f}"
+            )
+            return real_time_factor
+        except Exception as e:
+            logger.error(f"Calibration of {plan.compute_type} failed: {e}")
+            return None
+        finally:
+            gc.collect()
+
+    def load_plans(self):
+        if not os.path.exists(self.plans_file):
+            return
+        try:
+            with open(self.plans_file) as file:
+                self.plans = {
+                    key: ComputePlan.model_validate(plan)
+                    for key, plan in json.load(file).items()
+                }
+        except Exception as e:
+            logger.warning(f"Could not read compute plans: {e}")
+
+    def save_plans(self):
+        with open(self.plans_file, "w") as file:
+            json.dump(
+                {key: plan.model_dump() for key, plan in self.plans.items()},
+                file,
+                indent=2,
+            )
+
+
+compute_planner = ComputePlanner()
@@ -0,0 +1,76 @@
+from typing import Any
+from models.db import DecodingProfileType, Mode
+
+# Fall back to sampling when greedy output fails the quality checks, best_of
+# candidates are sampled at each non-zero temperature
+TEMPERATURE_FALLBACK = [0.0, 0.2, 0.4, 0.6, 0.8, 1.0]
+
+# faster-whisper transcribe() options per decoding profile, trading latency for accuracy
+DECODING_PROFILES: dict[DecodingProfileType, dict[str, Any]] = {
+    "fast": {
+        "beam_size": 1,
+        "best_of": 1,
+        "patience": 1.0,
+        "temperature": 0.0,
+        "condition_on_previous_text": False,
+        "without_timestamps": True,
+        "vad_filter": True,
+        "vad_parameters": {"threshold": 0.5, "min_silence_duration_ms": 500},
+    },
+    "balanced": {
+        "beam_size": 5,
+        "best_of": 5,
+        "patience": 1.0,
+        "temperature": 0.0,
+        "condition_on_previous_text": True,
+        "vad_filter": True,
+    },
+    "accurate": {
+        "beam_size": 8,
+        "best_of": 5,
+        "patience": 2.0,
+        "temperature": TEMPERATURE_FALLBACK,
+        "condition_on_previous_text": True,
+        "vad_filter": True,
+        "vad_parameters": {"threshold": 0.35},
+    },
+}
+
+
+def get_decoding_options(mode: Mode) -> dict[str, Any]:
+    """Returns the transcribe() options of the mode's decoding profile.
+
+    Args:
+        mode (Mode): The mode whose profile should be applied.
+
+    Returns:
+        dict: Keyword arguments for WhisperModel.transcribe.
+    """
+    if mode.decoding_profile in DECODING_PROFILES:
+        return dict(DECODING_PROFILES[mode.decoding_profile])
+    return {
+        "beam_size": mode.beam_size,
+        "best_of": mode.best_of,
+        "patience": mode.patience,
+        # best_of only has an effect when sampling, a single candidate disables the fallback
+        "temperature": TEMPERATURE_FALLBACK if mode.best_of > 1 else 0.0,
+        "condition_on_previous_text": mode.condition_on_previous_text,
+        "vad_filter": True,
+        "vad_parameters": {
+            "threshold": mode.vad_threshold,
+            "min_silence_duration_ms": mode.vad_min_silence_duration_ms,
+        },
+    }
+
+
+def describe_decoding_profile(mode: Mode) -> str:
+    """Returns the profile name, including the parameters of a custom profile"""
+    if mode.decoding_profile in DECODING_PROFILES:
+        return mode.decoding_profile
+    return (
+        f"custom(beam_size={mode.beam_size}, best_of={mode.best_of}, "
+        f"patience={mode.patience}, "
+        f"condition_on_previous_text={mode.condition_on_previous_text}, "
+        f"vad_threshold={mode.vad_threshold}, "
+        f"vad_min_silence_duration_ms={mode.vad_min_silence_duration_ms})"
+    )
@@ -0,0 +1,153 @@
+import threading
+from uuid import UUID
+import numpy as np
+from loguru import logger
+from models.db import Example, Prompt
+from utils.environment import get_example_token_budget
+
+# Rough token estimate, most tokenizers average about four characters per token
+CHARACTERS_PER_TOKEN = 4
+
+
+def estimate_tokens(example: Example) -> int:
+    return (len(example.input) + len(example.output)) // CHARACTERS_PER_TOKEN + 1
+
+
+def char_ngram_counts(text: str, dimensions: int, n: int) -> np.ndarray:
+    """Counts the hashed character n-grams of a text"""
+    data = np.frombuffer(f" {text.lower()} ".encode(), dtype=np.uint8)
+    counts = np.zeros(dimensions, dtype=np.float32)
+    if len(data) < n:
+        return counts
+    ngrams = np.zeros(len(data) - n + 1, dtype=np.uint32)
+    for offset in range(n):
+        ngrams = (ngrams << np.uint32(8)) | data[offset : len(data) - n + 1 + offset]
+    # Multiplicative hashing into the feature space, dimensions is a power of two
+    hashed = (ngrams * np.uint32(2654435761)) >> np.uint32(
+        32 - dimensions.bit_length() + 1
+    )
+    counts += np.bincount(hashed, minlength=dimensions)
+    return counts
+
+
+class ExampleIndex:
+    """
+    Character n-gram TF-IDF index over the inputs of a prompt's examples.
+
+    Each example input is a row of hashed n-gram counts, so adding an
+    example appends a row and updates the document frequencies without
+    touching the others. Queries weight both sides by the current inverse
+    document frequencies and rank the examples by cosine similarity.
+    """
+
+    DIMENSIONS = 4096
+    NGRAM = 3
+
+    def __init__(self):
+        self.example_ids: list[UUID] = []
+        self.counts = np.zeros((0, self.DIMENSIONS), dtype=np.float32)
+        self.document_frequency = np.zeros(self.DIMENSIONS, dtype=np.float32)
+
+    def add(self, examples: list[Example]):
+        if not examples:
+            return
+        counts = np.stack(
+            [
+                char_ngram_counts(example.input, self.DIMENSIONS, self.NGRAM)
+                for example in examples
+            ]
+        )
+        self.counts = np.vstack([self.counts, counts])
+        self.document_frequency += (counts > 0).sum(axis=0)
+        self.example_ids.extend(example.id for example in examples)
+
+    def score(self, text: str) -> np.ndarray:
+        """Returns the similarity of the text to every indexed example"""
+        idf = np.log((1 + len(self.example_ids)) / (1 + self.document_frequency)) + 1
+        vectors = self.counts * idf
+        query = char_ngram_counts(text, self.DIMENSIONS, self.NGRAM) * idf
+        norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query)
+        return np.divide(
+            vectors @ query, norms, out=np.zeros(len(vectors)), where=norms > 0
+        )
+
+
+class ExampleSelector:
+    """
+    Chooses the few-shot examples sent with a transcription.
+
+    As long as all examples of a prompt fit the token budget they are all
+    sent, which keeps the system prompt byte-stable so the server can reuse
+    its evaluation. Beyond the budget, the examples most similar to the
+    transcription are chosen, up to the budget and MAX_EXAMPLES, and sent in
+    their original order. Indexes are cached per prompt and extended
+    incrementally when examples are added.
+    """
+
+    MAX_EXAMPLES = 8
+
+    def __init__(self, token_budget: int = get_example_token_budget()):
+        self.token_budget = token_budget
+        self.lock = threading.Lock()
+        self.indexes: dict[UUID, ExampleIndex] = {}
+
+    def is_over_budget(self, prompt: Prompt) -> bool:
+        return sum(estimate_tokens(e) for e in prompt.examples) > self.token_budget
+
+    def get_index(self, prompt: Prompt) -> ExampleIndex:
+        """Returns the index of the prompt, adding examples it does not contain yet"""
+        with self.lock:
+            index = self.indexes.get(prompt.id)
+            example_ids = {example.id for example in prompt.examples}
+            if index and not set(index.example_ids) <= example_ids:
+                # Examples were removed, the document frequencies are stale
+                index = None
+            if not index:
+                index = self.indexes[prompt.id] = ExampleIndex()
+            indexed = set(index.example_ids)
+            missing = [e for e in prompt.examples if e.id not in indexed]
+            if missing:
+                index.add(missing)
+                logger.debug(f"Indexed {len(missing)} examples of prompt {prompt.id}")
+            return index
+
+    def add(self, prompt_id: UUID, example: Example):
+        """Extends a cached index with a new example"""
+        with self.lock:
+            index = self.indexes.get(prompt_id)
+            if index and example.id not in index.example_ids:
+                index.add([example])
+
+    def invalidate(self, prompt_id: UUID | None = None):
+        with self.lock:
+            if prompt_id is None:
+                self.indexes.clear()
+            else:
+                self.indexes.pop(prompt_id, None)
+
+    def select(self, prompt: Prompt, transcription: str) -> list[Example] | None:
+        """Returns the examples to send, or None if all of them fit the budget"""
+        if not self.is_over_budget(prompt):
+            return None
+        index = self.get_index(prompt)
+        scores = index.score(transcription)
+        examples = {example.id: example for example in prompt.examples}
+        selected: set[UUID] = set()
+        tokens = 0
+        for position in np.argsort(-scores, kind="stable"):
+            example = examples.get(index.example_ids[position])
+            if not example:
+                continue
+            if tokens + estimate_tokens(example) > self.token_budget:
+                continue
+            selected.add(example.id)
+            tokens += estimate_tokens(example)
+            if len(selected) == self.MAX_EXAMPLES:
+                break
+        logger.debug(
+            f"Selected {len(selected)} of {len(prompt.examples)} examples ({tokens} tokens)"
+        )
+        return [example for example in prompt.examples if example.id in selected]
+
+
+example_selector = ExampleSelector()
@@ -1,17 +1,16 @@
-import os
-from api.ipc import print_message
+from api.ipc import StreamCoalescer
 import time
 from typing import Literal, Optional
-from httpx import request
 from loguru import logger
-from models.db import (
-    Mode,
-    Prompt,
-)
+from ollama import GenerateResponse
+from models.db import Mode
 from models.exceptions import OllamaOfflineException
-from models.messages import TranscriptionMessage
 from models.db import ActiveWindowContext, ApplicationContext
-import ollama
+from services.ai.examples import example_selector
+from services.ai.keep_alive import language_model_keep_alive
+from services.ai.ollama_client import ollama_client
+from services.ai.prompt import generate_prompt
+from services.ai.prompt_cache import prompt_prefix_cache
 
 LANGUAGES = {
     "en": "English",
@@ -36,47 +35,89 @@ class AIProcessor:
             raise ValueError("No prompt provided")
         self.language_model = mode.language_model
         self.prompt = mode.prompt
+        # Final chunk of the last request, carries its token counts and durations
+        self.last_response: GenerateResponse | None = None
+
+    def load_model(self):
+        if example_selector.is_over_budget(self.prompt):
+            # The examples depend on the transcription, a request without a prompt only loads the model
+            ollama_client.generate(
+                model=self.language_model.name,
+                keep_alive=language_model_keep_alive.get_keep_alive(),
+            )
+        else:
+            # Loads the model and evaluates the system prompt ahead of the transcription
+            prompt_prefix_cache.prime(
+                self.language_model.name,
+                self.prompt,
+                keep_alive=language_model_keep_alive.get_keep_alive(),
+            )
+        language_model_keep_alive.touch(self.language_model.name)
+        logger.info(f"Activated {self.language_model.name}")
 
-    def load_model(self, keep_alive_minutes="15"):
-        ollama.generate(
+    def unload_model(self):
+        """Releases the model, which stays loaded until it has been idle for a while"""
+        language_model_keep_alive.touch(self.language_model.name)
+        logger.info(f"Released formatting model {self.language_model.name}")
+
+    def prefill(self, partial_transcription: str):
+        """Evaluates the start of a transcription ahead of the final request.
+
+        The final request must begin with the same text, so the server can
+        reuse the evaluated tokens.
+        """
+        if example_selector.is_over_budget(self.prompt):
+            # The system prompt is only known once the transcription is complete
+            return
+        prompt_prefix = prompt_prefix_cache.get(self.prompt)
+        response = ollama_client.generate(
             model=self.language_model.name,
-            prompt="Wake up!",
-            keep_alive=keep_alive_minutes + "m",
+            system=prompt_prefix.text,
+            prompt=partial_transcription,
+            keep_alive=language_model_keep_alive.get_keep_alive(),
+            options={"num_predict": 1},
         )
-        current_time = time.time()
-        self.timeout = current_time + int(keep_alive_minutes) * 60
-        logger.info(
-            f"Activated {self.language_model.name} for {keep_alive_minutes} Minutes."
+        prompt_prefix_cache.mark_evaluated(self.language_model.name, prompt_prefix)
+        logger.debug(
+            f"Prefilled {response.prompt_eval_count} tokens of the partial transcription"
         )
 
-    def unload_model(self):
-        os.system(f"ollama stop {self.language_model.name}")
-        logger.info(f"Deactivated formatting model {self.language_model.name}")
-
     def process(self, transcription: str) -> str:
         if not transcription:
             logger.info("No transcription provided")
             return ""
 
-        complete_system_prompt = generate_prompt(self.prompt)
+        examples = example_selector.select(self.prompt, transcription)
+        if examples is None:
+            # Sent byte-for-byte identically so the server reuses the evaluated prefix
+            prompt_prefix = prompt_prefix_cache.get(self.prompt)
+            complete_system_prompt = prompt_prefix.text
+        else:
+            prompt_prefix = None
+            complete_system_prompt = generate_prompt(self.prompt, examples)
 
         logger.info(f"System Prompt: {complete_system_prompt}")
         logger.info(f"Prompt: {transcription}")
 
-        stream = ollama.generate(
+        stream = ollama_client.stream_generate(
             model=self.language_model.name,
             system=complete_system_prompt,
             prompt=transcription,
-            keep_alive="1m",
-            stream=True,
+            keep_alive=language_model_keep_alive.get_keep_alive(),
         )
 
         message = ""
-        for chunk in stream:
-            content = chunk.response
-            if content:
-                message += content
-                print_message(TranscriptionMessage(transcription=content))
+        with StreamCoalescer() as coalescer:
+            for chunk in stream:
+                content = chunk.response
+                if content:
+                    message += content
+                    coalescer.write(content)
+        self.last_response = chunk
+        if prompt_prefix:
+            prompt_prefix_cache.mark_evaluated(self.language_model.name, prompt_prefix)
+        else:
+            prompt_prefix_cache.forget_model(self.language_model.name)
 
         prompt_tokens = chunk.prompt_eval_count
         response_tokens = chunk.eval_count
@@ -101,39 +142,6 @@ def post_process_result(result: str) -> str:
     return result.strip('"').strip()
 
 
-def generate_prompt(prompt: Prompt) -> str:
-    """Generates the prompt for the language model.
-
-    Args:
-        prompt (Prompt): The prompt object containing the system prompt and examples.
-
-    Returns:
-        str: The generated prompt.
-    """
-    joiner = "\n\n"
-    prompt_items = [prompt.system_prompt]
-
-    if len(prompt.examples) > 0:
-        examples = "\n".join(
-            [
-                f'EXAMPLE {i + 1}:\n# "{example.input}"\n"{example.output}"'
-                for i, example in enumerate(prompt.examples)
-            ]
-        )
-        prompt_items.append(examples)
-
-    if prompt.include_clipboard:
-        # TODO: Implement clipboard functionality
-        pass
-
-    if prompt.include_active_window:
-        # TODO: Implement active window functionality
-        pass
-
-    prompt_items.append("# INPUT:")
-    return joiner.join(prompt_items)
-
-
 # Old code
 class Formatter:
     def __init__(self, language: str | None = None):
@@ -254,20 +262,14 @@ class LocalFormatter(Formatter):
         super().__init__()
 
     def is_ollama_running(self):
-        try:
-            response = request(method="GET", url="http://localhost:11434")
-            if response.status_code == 200:
-                logger.info("Ollama is running")
-                return True
-            else:
-                logger.error("Ollama is not running")
-                return False
-        except Exception as e:
-            logger.error(f"Error checking Ollama status: {e}")
-            return False
+        if ollama_client.is_running():
+            logger.info("Ollama is running")
+            return True
+        logger.error("Ollama is not running")
+        return False
 
     def load_model(self, keep_alive_minutes="15"):
-        ollama.generate(
+        ollama_client.generate(
             model=self.MODEL,
             prompt="Wake up!",
             keep_alive=keep_alive_minutes + "m",
@@ -281,7 +283,7 @@ class LocalFormatter(Formatter):
 
     def unload_model(self):
         if self.status == "online":
-            os.system(f"ollama stop {self.MODEL}")
+            language_model_keep_alive.unload(self.MODEL, "released")
             self.status = "offline"
             logger.info(f"Deactivated formatting model {self.MODEL}")
 
@@ -298,7 +300,7 @@ class LocalFormatter(Formatter):
         if raw_transcription == "":
             logger.info("No transcription provided")
             return ""
-        response = ollama.generate(
+        response = ollama_client.generate(
             model=self.MODEL,
             keep_alive="15m",
             system=self.generate_system_prompt(),
@@ -0,0 +1,85 @@
+import threading
+import time
+from loguru import logger
+from services.ai.ollama_client import ollama_client
+from services.ai.prompt_cache import prompt_prefix_cache
+from utils.environment import get_language_model_idle_ttl
+from utils.hardware import get_available_memory_mb
+
+
+class LanguageModelKeepAlive:
+    """
+    Keeps language models loaded in Ollama between dictations.
+
+    Every request asks Ollama to keep the model loaded slightly longer than
+    the idle window, as a fallback in case this process exits. The last use
+    of each model is tracked here and models are unloaded through the API
+    once they have been idle for the whole window, or earlier, least
+    recently used first, when the system runs low on free memory.
+    """
+
+    CHECK_INTERVAL = 30  # seconds
+    MIN_AVAILABLE_MB = 1024
+
+    def __init__(self, idle_ttl: float = get_language_model_idle_ttl()):
+        self.idle_ttl = idle_ttl
+        self.last_used: dict[str, float] = {}
+        self.lock = threading.Lock()
+        self.monitor_thread: threading.Thread | None = None
+
+    def get_keep_alive(self) -> str:
+        """Returns the keep_alive to send with requests for a tracked model"""
+        return f"{int(self.idle_ttl + self.CHECK_INTERVAL)}s"
+
+    def touch(self, model: str):
+        with self.lock:
+            self.last_used[model] = time.time()
+            if not self.monitor_thread:
+                self.monitor_thread = threading.Thread(target=self.monitor, daemon=True)
+                self.monitor_thread.start()
+
+    def unload(self, model: str, reason: str):
+        with self.lock:
+            self.last_used.pop(model, None)
+        try:
+            ollama_client.generate(model=model, keep_alive=0)
+            logger.info(f"Unloaded language model {model}: {reason}")
+        except Exception as e:
+            logger.warning(f"Could not unload language model {model}: {e}")
+        finally:
+            # Whether the model is still loaded is unknown after a failure
+            prompt_prefix_cache.forget_model(model)
+
+    def trim(self):
+        """Unloads idle models and, under memory pressure, the least recently used"""
+        now = time.time()
+        with self.lock:
+            idle = [
+                model
+                for model, last_used in self.last_used.items()
+                if now - last_used > self.idle_ttl
+            ]
+        for model in idle:
+            self.unload(model, "idle")
+
+        available_mb = get_available_memory_mb()
+        if available_mb is None or available_mb >= self.MIN_AVAILABLE_MB:
+            return
+        with self.lock:
+            least_recently_used = min(
+                self.last_used, key=self.last_used.__getitem__, default=None
+            )
+        if least_recently_used:
+            self.unload(least_recently_used, f"only {available_mb} MB memory available")
+
+    def monitor(self):
+        while True:
+            time.sleep(self.CHECK_INTERVAL)
+            self.trim()
+            with self.lock:
+                if not self.last_used:
+                    self.monitor_thread = None
+                    return
+
+
+language_model_keep_alive = LanguageModelKeepAlive()
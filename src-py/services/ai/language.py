@@ -0,0 +1,79 @@
+import time
+from uuid import UUID
+from loguru import logger
+from pydantic import BaseModel
+from models.db import LanguagePrior
+
+# Detections needed before a prior is trusted
+MIN_OBSERVATIONS = 3
+# Moving average of the detection probability required to skip detection
+MIN_CONFIDENCE = 0.8
+# Weight of the latest detection in the moving average
+SMOOTHING = 0.3
+# Run detection again after this many dictations with the prior
+REVALIDATE_EVERY = 20
+# Mean segment log probability below which a forced language is suspected wrong
+MIN_AVG_LOGPROB = -1.0
+
+
+class LanguageDetection(BaseModel):
+    language: str
+    probability: float
+    detected: bool  # False if the language was forced
+    duration: float | None = None  # seconds, if detection ran
+    avg_logprob: float | None = None
+
+
+def get_prior_language(prior: LanguagePrior | None) -> str | None:
+    """Returns the language to force instead of running detection, if any"""
+    if (
+        not prior
+        or prior.needs_check
+        or prior.observations < MIN_OBSERVATIONS
+        or prior.confidence < MIN_CONFIDENCE
+        or prior.since_verified >= REVALIDATE_EVERY
+    ):
+        return None
+    return prior.language
+
+
+def update_language_prior(
+    prior: LanguagePrior | None, mode_id: UUID, detection: LanguageDetection
+) -> LanguagePrior:
+    """Folds the outcome of a transcription into the mode's language prior.
+
+    A detected language either reinforces the prior or, if it disagrees,
+    restarts it. A transcription with a forced language only counts towards
+    the revalidation interval, unless its segments decoded poorly, in which
+    case the next dictation runs detection again.
+    """
+    if not detection.detected:
+        assert prior is not None
+        prior.since_verified += 1
+        if (
+            detection.avg_logprob is not None
+            and detection.avg_logprob < MIN_AVG_LOGPROB
+        ):
+            logger.info(
+                f"Low confidence decoding in {prior.language} "
+                f"(avg logprob {detection.avg_logprob:.2f}), checking the language next time"
+            )
+            prior.needs_check = True
+    elif not prior or prior.language != detection.language:
+        if prior:
+            logger.info(
+                f"Detected {detection.language} instead of {prior.language}, resetting language prior"
+            )
+        prior = LanguagePrior(
+            mode_id=mode_id,
+            language=detection.language,
+            confidence=detection.probability,
+            observations=1,
+        )
+    else:
+        prior.confidence += SMOOTHING * (detection.probability - prior.confidence)
+        prior.observations += 1
+        prior.since_verified = 0
+        prior.needs_check = False
+    prior.updated_at = time.time()
+    return prior
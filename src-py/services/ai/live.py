@@ -0,0 +1,131 @@
+import threading
+from typing import Optional
+import numpy as np
+from loguru import logger
+from faster_whisper.vad import VadOptions, get_speech_timestamps
+from api.ipc import print_message
+from models.messages import TranscriptionMessage
+from services.ai.transcriber import LocalTranscriber
+from services.audio.processing import WHISPER_SAMPLE_RATE, prepare_for_transcription
+from services.audio.recorder import AudioRecorder
+
+
+class LiveTranscriber:
+    """
+    Transcribes a recording in chunks while it is still in progress.
+
+    A worker thread watches the recorder buffer, cuts the pending audio at
+    pauses detected by the Silero VAD and transcribes each finished chunk,
+    passing the text so far as context. Only the audio after the last cut is
+    left to decode once the recording stops.
+    """
+
+    POLL_INTERVAL = 0.5
+    MIN_CHUNK_SECONDS = 5
+    MAX_CHUNK_SECONDS = 25
+    MIN_SILENCE_MS = 600
+    CONTEXT_CHARACTERS = 200
+
+    def __init__(self, transcriber: LocalTranscriber, recorder: AudioRecorder):
+        self.transcriber = transcriber
+        self.recorder = recorder
+        self.committed_frames = 0
+        self.chunks: list[str] = []
+        self.vad_options = VadOptions(min_silence_duration_ms=self.MIN_SILENCE_MS)
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.error: Optional[Exception] = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        logger.debug(f"Live transcription started in thread {self.thread.name}")
+
+    def run(self):
+        try:
+            if not self.transcriber.model:
+                self.transcriber.load_model()
+            while not self.stop_event.wait(self.POLL_INTERVAL):
+                self.transcribe_pending(final=False)
+        except Exception as e:
+            logger.exception(e)
+            self.error = e
+
+    def transcribe_pending(self, final: bool):
+        audio = self.recorder.get_audio(self.committed_frames)
+        if audio is None or self.recorder.audio_buffer is None:
+            return
+        samplerate = self.recorder.audio_buffer.samplerate
+        pending = prepare_for_transcription(audio, samplerate)
+        if not final and len(pending) < self.MIN_CHUNK_SECONDS * WHISPER_SAMPLE_RATE:
+            return
+        if not len(pending):
+            return
+
+        speech = get_speech_timestamps(pending, self.vad_options)
+        if not speech:
+            # Nothing but silence, skip past it without decoding
+            self.commit(len(pending), samplerate)
+            return
+
+        cut = len(pending) if final else self.find_cut(pending, speech)
+        if cut is None:
+            return
+
+        text = self.transcriber.transcribe_audio(
+            pending[:cut], initial_prompt=self.get_context()
+        )
+        self.commit(cut, samplerate)
+        if text:
+            self.chunks.append(text)
+            print_message(TranscriptionMessage(transcription=text))
+        logger.debug(
+            f"Live chunk of {cut / WHISPER_SAMPLE_RATE:.2f}s transcribed: {text}"
+        )
+
+    def commit(self, samples: int, samplerate: int):
+        self.committed_frames += int(samples * samplerate / WHISPER_SAMPLE_RATE)
+
+    def find_cut(self, pending: np.ndarray, speech: list[dict]) -> Optional[int]:
+        """Returns the sample index to cut the pending audio at, if there is one"""
+        min_silence = self.MIN_SILENCE_MS * WHISPER_SAMPLE_RATE // 1000
+        gaps = list(
+            zip(
+                [s["end"] for s in speech],
+                [s["start"] for s in speech[1:]] + [len(pending)],
+            )
+        )
+        pauses = [(end, start) for end, start in gaps if start - end >= min_silence]
+        if pauses:
+            end, next_start = pauses[-1]
+            return (end + next_start) // 2
+
+        if len(pending) >= self.MAX_CHUNK_SECONDS * WHISPER_SAMPLE_RATE:
+            # No pause in sight, cut at the longest gap between speech regions
+            inner_gaps = gaps[:-1]
+            if inner_gaps:
+                end, next_start = max(inner_gaps, key=lambda gap: gap[1] - gap[0])
+                return (end + next_start) // 2
+            return len(pending)
+        return None
+
+    def get_context(self) -> Optional[str]:
+        if not self.chunks:
+            return None
+        return " ".join(self.chunks)[-self.CONTEXT_CHARACTERS :]
+
+    def finish(self) -> str:
+        """Stops the worker, transcribes the remaining audio and returns the full text"""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+        if self.error:
+            raise self.error
+        self.transcribe_pending(final=True)
+        return " ".join(self.chunks).strip()
+
+    def cancel(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+        logger.debug("Live transcription cancelled")
@@ -0,0 +1,206 @@
+import gc
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, NamedTuple
+import numpy as np
+from loguru import logger
+from faster_whisper import WhisperModel
+from models.messages import VoiceModelStateType
+from services.audio.processing import WHISPER_SAMPLE_RATE
+from utils.environment import (
+    get_voice_model_cache_budget_mb,
+    get_voice_model_idle_ttl,
+    is_model_warm_up_enabled,
+)
+from utils.hardware import get_available_memory_mb
+
+
+class ModelKey(NamedTuple):
+    name: str
+    device: str
+    compute_type: str
+
+
+class CachedModel:
+    WARM_UP_SECONDS = 1
+
+    def __init__(self, model: WhisperModel, size_mb: int):
+        self.model = model
+        self.size_mb = size_mb
+        self.last_used = time.time()
+        # Set once the model has run an inference, by warm-up or a dictation
+        self.warm = threading.Event()
+        # Set once a dictation is waiting for the model, warm-up would only slow it down
+        self.claimed = threading.Event()
+
+    def warm_up(self):
+        """Runs a short noise clip through the model.
+
+        The first inference after loading pays for CTranslate2's memory
+        allocations and thread pool start-up, this moves that cost off the
+        first dictation. Skipped if a dictation already claimed the model.
+        """
+        if self.claimed.is_set():
+            logger.debug("Voice model claimed before warm-up, skipping warm-up")
+            return
+        start_time = time.time()
+        try:
+            samples = self.WARM_UP_SECONDS * WHISPER_SAMPLE_RATE
+            audio = np.random.default_rng(0).normal(0, 0.01, samples)
+            segments, _ = self.model.transcribe(
+                audio.astype(np.float32), beam_size=5, language="en"
+            )
+            for _ in segments:
+                pass
+            logger.info(f"Voice model warmed up in {time.time() - start_time:.3f}s")
+        except Exception as e:
+            logger.warning(f"Voice model warm-up failed: {e}")
+        finally:
+            self.warm.set()
+
+
+class VoiceModelCache:
+    """
+    Keeps loaded voice models resident between dictations.
+
+    Models are kept in an LRU keyed by model name, device and compute type.
+    The least recently used models are evicted when the memory budget is
+    exceeded, when the system runs low on free memory, or after they have
+    been idle for longer than the idle TTL.
+    """
+
+    CHECK_INTERVAL = 30  # seconds
+    MIN_AVAILABLE_MB = 1024
+
+    def __init__(
+        self,
+        budget_mb: int = get_voice_model_cache_budget_mb(),
+        idle_ttl: float = get_voice_model_idle_ttl(),
+    ):
+        self.budget_mb = budget_mb
+        self.idle_ttl = idle_ttl
+        self.models: OrderedDict[ModelKey, CachedModel] = OrderedDict()
+        self.lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.monitor_thread: threading.Thread | None = None
+
+    def get(
+        self,
+        key: ModelKey,
+        size_mb: int,
+        loader: Callable[[], WhisperModel],
+        warm_up: bool = False,
+    ) -> WhisperModel:
+        """Returns the cached model for the key, loading it on a miss.
+
+        Only loads ahead of a dictation should warm up, a model loaded when the
+        audio is ready would share its first inference with the warm-up.
+        """
+        with self.lock:
+            cached = self.models.get(key)
+            if cached:
+                self.hits += 1
+                cached.last_used = time.time()
+                self.models.move_to_end(key)
+                logger.info(f"Voice model cache hit for {key} ({self.get_stats()})")
+                return cached.model
+
+            self.misses += 1
+            self.make_room(size_mb)
+            model = loader()
+            cached = CachedModel(model, size_mb)
+            self.models[key] = cached
+            logger.info(f"Voice model cache miss for {key} ({self.get_stats()})")
+            self.start_monitor()
+        if warm_up and is_model_warm_up_enabled():
+            threading.Thread(target=cached.warm_up, daemon=True).start()
+        return model
+
+    def get_state(self, key: ModelKey) -> VoiceModelStateType:
+        with self.lock:
+            cached = self.models.get(key)
+        return "warm" if cached and cached.warm.is_set() else "cold"
+
+    def claim(self, key: ModelKey):
+        """Marks a model as needed by a dictation, so a pending warm-up is skipped"""
+        with self.lock:
+            if key in self.models:
+                self.models[key].claimed.set()
+
+    def mark_warm(self, key: ModelKey):
+        with self.lock:
+            if key in self.models:
+                self.models[key].warm.set()
+
+    def touch(self, key: ModelKey):
+        with self.lock:
+            if key in self.models:
+                self.models[key].last_used = time.time()
+
+    def make_room(self, size_mb: int):
+        while self.models and (
+            sum(cached.size_mb for cached in self.models.values()) + size_mb
+            > self.budget_mb
+        ):
+            self.evict_oldest("memory budget exceeded")
+
+    def evict_oldest(self, reason: str):
+        key, _ = self.models.popitem(last=False)
+        self.evictions += 1
+        gc.collect()
+        logger.info(f"Evicted voice model {key}: {reason}")
+
+    def evict_all(self):
+        with self.lock:
+            while self.models:
+                self.evict_oldest("cache cleared")
+
+    def trim(self):
+        """Evicts idle models and, under memory pressure, the least recently used"""
+        with self.lock:
+            now = time.time()
+            for key, cached in list(self.models.items()):
+                if now - cached.last_used > self.idle_ttl:
+                    del self.models[key]
+                    self.evictions += 1
+                    logger.info(f"Evicted voice model {key}: idle")
+            available_mb = get_available_memory_mb()
+            while (
+                self.models
+                and available_mb is not None
+                and available_mb < self.MIN_AVAILABLE_MB
+            ):
+                freed_mb = next(iter(self.models.values())).size_mb
+                self.evict_oldest(f"only {available_mb} MB memory available")
+                available_mb += freed_mb
+            gc.collect()
+
+    def start_monitor(self):
+        if self.monitor_thread:
+            return
+        self.monitor_thread = threading.Thread(target=self.monitor, daemon=True)
+        self.monitor_thread.start()
+
+    def monitor(self):
+        while True:
+            time.sleep(self.CHECK_INTERVAL)
+            self.trim()
+            with self.lock:
+                if not self.models:
+                    self.monitor_thread = None
+                    return
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "resident": [key.name for key in self.models],
+            }
+
+
+voice_model_cache = VoiceModelCache()
@@ -0,0 +1,189 @@
+import asyncio
+import queue
+import threading
+from typing import Any, Awaitable, Callable, Iterator, Optional, TypeVar
+import httpx
+from loguru import logger
+from ollama import AsyncClient, GenerateResponse, ListResponse, ProcessResponse
+
+T = TypeVar("T")
+
+# Marks the end of a stream on the chunk queue
+_END = object()
+
+
+class OllamaClient:
+    """
+    Process-wide connection pool to the local Ollama API.
+
+    A single ollama.AsyncClient runs on a dedicated event loop thread, so
+    every caller shares its keep-alive connections, timeouts and retry
+    policy. The methods are synchronous wrappers that submit requests to
+    that loop. Streams are bridged to a plain iterator and closing the
+    iterator, or setting its cancel event, aborts the HTTP request, which
+    makes Ollama stop generating.
+    """
+
+    CONNECT_TIMEOUT = 2.0  # seconds
+    READ_TIMEOUT = 120.0  # seconds, loading a large model can take a while
+    HEALTH_CHECK_TIMEOUT = 2.0  # seconds
+    MAX_RETRIES = 2
+    RETRY_DELAY = 0.5  # seconds, doubled after every attempt
+    KEEPALIVE_EXPIRY = 300  # seconds an idle connection is kept open
+
+    def __init__(self, host: Optional[str] = None):
+        self.host = host
+        self.lock = threading.Lock()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread: Optional[threading.Thread] = None
+        self.client: Optional[AsyncClient] = None
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        with self.lock:
+            if self.loop:
+                return self.loop
+            self.loop = asyncio.new_event_loop()
+            self.thread = threading.Thread(
+                target=self.loop.run_forever, name="ollama-client", daemon=True
+            )
+            self.thread.start()
+            self.client = AsyncClient(
+                self.host,
+                timeout=httpx.Timeout(self.READ_TIMEOUT, connect=self.CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_keepalive_connections=4,
+                    keepalive_expiry=self.KEEPALIVE_EXPIRY,
+                ),
+            )
+            logger.debug("Ollama client started")
+            return self.loop
+
+    def run(self, coroutine: Awaitable[T], timeout: Optional[float] = None) -> T:
+        """Runs a coroutine on the client's event loop and waits for its result"""
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.start())  # type: ignore[arg-type]
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    async def retry(self, request: Callable[[], Awaitable[T]]) -> T:
+        """Retries a request that failed to reach the server"""
+        delay = self.RETRY_DELAY
+        for attempt in range(self.MAX_RETRIES + 1):
+            try:
+                return await request()
+            except (ConnectionError, httpx.TransportError) as e:
+                if attempt == self.MAX_RETRIES:
+                    raise
+                logger.warning(f"Ollama request failed ({e}), retrying in {delay}s")
+                await asyncio.sleep(delay)
+                delay *= 2
+        raise AssertionError("unreachable")
+
+    def get_client(self) -> AsyncClient:
+        self.start()
+        assert self.client is not None
+        return self.client
+
+    def is_running(self) -> bool:
+        """Checks whether the Ollama server responds, without retrying"""
+        try:
+            self.run(self.get_client().ps(), timeout=self.HEALTH_CHECK_TIMEOUT)
+            return True
+        except Exception as e:
+            logger.error(f"Error checking Ollama status: {e}")
+            return False
+
+    def list_models(self) -> ListResponse:
+        client = self.get_client()
+        return self.run(self.retry(lambda: client.list()))
+
+    def ps(self) -> ProcessResponse:
+        client = self.get_client()
+        return self.run(self.retry(lambda: client.ps()))
+
+    def generate(self, **kwargs: Any) -> GenerateResponse:
+        client = self.get_client()
+        return self.run(
+            self.retry(lambda: client.generate(**kwargs, stream=False))  # type: ignore[arg-type]
+        )
+
+    def stream_generate(
+        self, cancel_event: Optional[threading.Event] = None, **kwargs: Any
+    ) -> Iterator[GenerateResponse]:
+        """Streams the chunks of a generate request.
+
+        Args:
+            cancel_event: Stops the stream and aborts the request when set.
+            **kwargs: Arguments of ollama.AsyncClient.generate.
+        """
+        client = self.get_client()
+        chunks: queue.Queue = queue.Queue()
+
+        async def produce():
+            delay = self.RETRY_DELAY
+            received = False
+            for attempt in range(self.MAX_RETRIES + 1):
+                try:
+                    stream = await client.generate(**kwargs, stream=True)  # type: ignore[arg-type]
+                    async for chunk in stream:
+                        received = True
+                        chunks.put(chunk)
+                    chunks.put(_END)
+                    return
+                except asyncio.CancelledError:
+                    chunks.put(_END)
+                    raise
+                except (ConnectionError, httpx.TransportError) as e:
+                    # A stream that already produced output cannot be resumed
+                    if received or attempt == self.MAX_RETRIES:
+                        chunks.put(e)
+                        return
+                    logger.warning(f"Ollama stream failed ({e}), retrying in {delay}s")
+                    await asyncio.sleep(delay)
+                    delay *= 2
+                except Exception as e:
+                    chunks.put(e)
+                    return
+
+        future = asyncio.run_coroutine_threadsafe(produce(), self.start())
+        try:
+            while True:
+                try:
+                    chunk = chunks.get(timeout=0.1)
+                except queue.Empty:
+                    if cancel_event and cancel_event.is_set():
+                        logger.info("Ollama stream cancelled")
+                        return
+                    continue
+                if chunk is _END:
+                    return
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+                if cancel_event and cancel_event.is_set():
+                    logger.info("Ollama stream cancelled")
+                    return
+        finally:
+            # Closes the HTTP stream if the consumer stopped early
+            future.cancel()
+
+    def close(self):
+        with self.lock:
+            if not self.loop:
+                return
+            if self.client:
+                asyncio.run_coroutine_threadsafe(
+                    self.client.close(), self.loop
+                ).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            if self.thread:
+                self.thread.join()
+            self.loop.close()
+            self.loop = None
+            self.thread = None
+            self.client = None
+
+
+ollama_client = OllamaClient()
@@ -0,0 +1,93 @@
+import queue
+import threading
+from typing import Callable, Optional
+from loguru import logger
+from models.messages import SegmentMessage
+from services.ai.formatter import AIProcessor
+
+
+class LanguageModelPipeline:
+    """
+    Feeds finished transcript segments to the language model while the rest
+    of the recording is still being decoded.
+
+    The result depends on the whole transcript, so generation itself cannot
+    start early. Everything before it can: a worker thread loads the model
+    and keeps sending the growing transcript as single-token prefill
+    requests. When decoding finishes, the server has already evaluated the
+    transcript up to the last segments and only the tail is left before the
+    first generated token.
+    """
+
+    MAX_QUEUED_SEGMENTS = 64
+    MIN_PREFILL_CHARACTERS = 200
+
+    def __init__(self, load_processor: Callable[[], Optional[AIProcessor]]):
+        self.load_processor = load_processor
+        self.segments: queue.Queue[Optional[SegmentMessage]] = queue.Queue(
+            maxsize=self.MAX_QUEUED_SEGMENTS
+        )
+        self.processor: Optional[AIProcessor] = None
+        self.transcript = ""
+        self.prefilled_characters = 0
+        # Prefilling stops if a segment had to be dropped, the prefix would no longer match
+        self.complete = True
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        logger.debug(f"Language model pipeline started in thread {self.thread.name}")
+
+    def put(self, segment: SegmentMessage):
+        """Queues a finished segment. Never blocks the decoder."""
+        try:
+            self.segments.put_nowait(segment)
+        except queue.Full:
+            logger.warning("Language model pipeline is behind, stopping prefill")
+            self.complete = False
+
+    def run(self):
+        try:
+            self.processor = self.load_processor()
+        except Exception as e:
+            logger.error(f"Loading the language model failed: {e}")
+        while (segment := self.segments.get()) is not None:
+            self.transcript += segment.text
+            # Catch up on everything that queued up during the last request
+            while not self.segments.empty():
+                segment = self.segments.get_nowait()
+                if segment is None:
+                    return
+                self.transcript += segment.text
+            if (
+                self.processor
+                and self.complete
+                and len(self.transcript) - self.prefilled_characters
+                >= self.MIN_PREFILL_CHARACTERS
+            ):
+                self.prefill()
+
+    def prefill(self):
+        assert self.processor is not None
+        try:
+            self.processor.prefill(self.transcript.lstrip())
+            self.prefilled_characters = len(self.transcript)
+        except Exception as e:
+            logger.warning(f"Prefill failed, stopping prefill: {e}")
+            self.complete = False
+
+    def finish(self) -> Optional[AIProcessor]:
+        """Waits for the pending prefill and returns the loaded processor"""
+        self.segments.put(None)
+        if self.thread:
+            self.thread.join()
+        logger.debug(
+            f"Prefilled {self.prefilled_characters} of {len(self.transcript)} characters"
+        )
+        return self.processor
+
+    def cancel(self):
+        processor = self.finish()
+        if processor:
+            processor.unload_model()
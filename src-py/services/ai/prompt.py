@@ -1,27 +1,31 @@
 from loguru import logger
-from models.db import Prompt
+from models.db import Example, Prompt
 
 
-def generate_prompt(prompt: Prompt) -> str:
+def generate_prompt(prompt: Prompt, examples: list[Example] | None = None) -> str:
     """Generates the prompt for the language model.
 
     Args:
         prompt (Prompt): The prompt object containing the system prompt and examples.
+        examples (list[Example], optional): The examples to include instead of all
+            of the prompt's examples.
 
     Returns:
         str: The generated prompt.
     """
     joiner = "\n\n"
     prompt_items = [prompt.system_prompt]
+    if examples is None:
+        examples = prompt.examples
 
-    if len(prompt.examples) > 0:
-        examples = "\n".join(
+    if len(examples) > 0:
+        examples_text = "\n".join(
             [
                 f'EXAMPLE {i + 1}:\n# "{example.input}"\n"{example.output}"'
-                for i, example in enumerate(prompt.examples)
+                for i, example in enumerate(examples)
             ]
         )
-        prompt_items.append(examples)
+        prompt_items.append(examples_text)
 
     if prompt.include_clipboard:
         # TODO: Implement clipboard functionality
@@ -0,0 +1,83 @@
+import hashlib
+import threading
+from typing import NamedTuple
+from uuid import UUID
+from loguru import logger
+from models.db import Prompt
+from services.ai.ollama_client import ollama_client
+from services.ai.prompt import generate_prompt
+
+
+class PromptPrefix(NamedTuple):
+    text: str
+    hash: str
+
+
+class PromptPrefixCache:
+    """
+    Keeps the system prompt of each mode byte-stable and evaluated.
+
+    Ollama reuses the evaluated tokens of the longest prefix a request
+    shares with the previous one in the same slot, so a system prompt that
+    is sent byte-for-byte identically only has to be evaluated once while
+    the model stays loaded. The rendered system prompt is cached per prompt
+    and invalidated when the prompt or its examples change. Priming
+    evaluates the prefix when the model is loaded, before the transcription
+    is ready. It is always sent: Ollama may have restarted, evicted the model
+    or let it expire since, and on a warm server re-sending an identical
+    prefix costs a single token.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.prefixes: dict[UUID, PromptPrefix] = {}
+        # Hash of the prefix each loaded model evaluated last, as far as known here
+        self.evaluated: dict[str, str] = {}
+
+    def get(self, prompt: Prompt) -> PromptPrefix:
+        with self.lock:
+            prefix = self.prefixes.get(prompt.id)
+            if not prefix:
+                text = generate_prompt(prompt)
+                prefix = PromptPrefix(text, hashlib.sha256(text.encode()).hexdigest())
+                self.prefixes[prompt.id] = prefix
+            return prefix
+
+    def prime(self, model: str, prompt: Prompt, keep_alive: str):
+        """Loads the model and evaluates the system prompt"""
+        prefix = self.get(prompt)
+        with self.lock:
+            expected_reuse = self.evaluated.get(model) == prefix.hash
+        response = ollama_client.generate(
+            model=model,
+            system=prefix.text,
+            prompt=" ",
+            keep_alive=keep_alive,
+            options={"num_predict": 1},
+        )
+        self.mark_evaluated(model, prefix)
+        logger.debug(
+            f"Primed {model} with prompt prefix {prefix.hash[:12]}, "
+            f"{response.prompt_eval_count} tokens evaluated"
+            + ("" if expected_reuse else " (not evaluated before)")
+        )
+
+    def mark_evaluated(self, model: str, prefix: PromptPrefix):
+        with self.lock:
+            self.evaluated[model] = prefix.hash
+
+    def invalidate(self, prompt_id: UUID | None = None):
+        """Drops the cached prefix of a prompt, or of every prompt if none is given"""
+        with self.lock:
+            if prompt_id is None:
+                self.prefixes.clear()
+            else:
+                self.prefixes.pop(prompt_id, None)
+
+    def forget_model(self, model: str):
+        """Called when a model was unloaded and its evaluated prefixes are gone"""
+        with self.lock:
+            self.evaluated.pop(model, None)
+
+
+prompt_prefix_cache = PromptPrefixCache()
@@ -0,0 +1,83 @@
+import re
+import threading
+from uuid import UUID
+from loguru import logger
+from models.db import Mode, TextReplacement
+
+
+class ReplacementEngine:
+    """
+    Applies a set of text replacements in a single pass.
+
+    All rules are compiled into one alternation regex, with one capturing
+    group per rule so the matching rule is found by its group index. Longer
+    originals come first, so at any position the longest rule wins and the
+    result no longer depends on the order the rules were created in. When
+    two rules share an original, the first one wins.
+    """
+
+    def __init__(self, text_replacements: list[TextReplacement]):
+        self.replacements: list[str] = []
+        patterns: list[str] = []
+        seen: set[tuple[str, bool, bool]] = set()
+        for tr in sorted(
+            text_replacements, key=lambda tr: len(tr.original_text), reverse=True
+        ):
+            key = (tr.original_text, tr.whole_word, tr.case_insensitive)
+            if not tr.original_text or not tr.replacement_text or key in seen:
+                continue
+            seen.add(key)
+            patterns.append(f"({tr.get_pattern()})")
+            self.replacements.append(tr.replacement_text)
+        self.pattern = re.compile("|".join(patterns)) if patterns else None
+
+    def __len__(self):
+        return len(self.replacements)
+
+    def apply(self, text: str) -> str:
+        if not self.pattern:
+            return text
+        return self.pattern.sub(
+            lambda match: self.replacements[match.lastindex - 1],  # type: ignore
+            text,
+        )
+
+
+class ReplacementEngineCache:
+    """
+    Keeps the compiled replacement engine of each mode.
+
+    The engine of a mode combines the global replacements with the mode's
+    own. The database invalidates a mode when its replacements change, and
+    every mode when a global replacement changes.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.engines: dict[UUID, ReplacementEngine] = {}
+
+    def get(
+        self, mode: Mode, global_text_replacements: list[TextReplacement]
+    ) -> ReplacementEngine:
+        with self.lock:
+            engine = self.engines.get(mode.id)
+            if not engine:
+                engine = ReplacementEngine(
+                    global_text_replacements + mode.text_replacements
+                )
+                self.engines[mode.id] = engine
+                logger.debug(
+                    f"Compiled {len(engine)} text replacements for mode {mode.name}"
+                )
+            return engine
+
+    def invalidate(self, mode_id: UUID | None = None):
+        """Drops the engine of a mode, or of every mode if no mode is given"""
+        with self.lock:
+            if mode_id is None:
+                self.engines.clear()
+            else:
+                self.engines.pop(mode_id, None)
+
+
+replacement_engines = ReplacementEngineCache()
@@ -1,19 +1,41 @@
-import gc
+import time
+from typing import BinaryIO, Callable
+import numpy as np
 from loguru import logger
 from faster_whisper import WhisperModel
-from models.db import Mode, TextReplacement
+from models.db import LanguagePrior, Mode, TextReplacement
 from models.exceptions import ModelNotLoadedException
+from models.messages import SegmentMessage
+from services.ai.compute import compute_planner, get_compute_size_mb
+from services.ai.decoding import describe_decoding_profile, get_decoding_options
+from services.ai.language import LanguageDetection, get_prior_language
+from services.ai.model_cache import ModelKey, voice_model_cache
+from services.ai.replacements import replacement_engines
+from services.audio.processing import WHISPER_SAMPLE_RATE
+from services.storage.transcription_cache import (
+    CachedSegment,
+    CachedTranscription,
+    fingerprint_audio,
+    transcription_cache,
+)
 
 
 class Transcriber:
     def __init__(
-        self, mode: Mode, global_text_replacements: list[TextReplacement] = []
+        self,
+        mode: Mode,
+        global_text_replacements: list[TextReplacement] = [],
+        language_prior: LanguagePrior | None = None,
     ):
         self.mode = mode
         self.global_text_replacements = global_text_replacements
+        self.language_prior = language_prior
+        self.language_detection: LanguageDetection | None = None
         self.model = None
 
-    def transcribe_audio(self, file_name: str, language: str | None = None):
+    def transcribe_audio(
+        self, audio: str | np.ndarray, initial_prompt: str | None = None
+    ):
         raise NotImplementedError
 
     def get_voice_language(self):
@@ -22,7 +44,7 @@ class Transcriber:
     # def set_language(self, language: str):
     #     self.language = language
 
-    def load_model(self):
+    def load_model(self, warm_up: bool = False):
         raise NotImplementedError
 
     def unload_model(self):
@@ -31,69 +53,208 @@ class Transcriber:
 
 class LocalTranscriber(Transcriber):
     def __init__(
-        self, mode: Mode, global_text_replacements: list[TextReplacement] = []
+        self,
+        mode: Mode,
+        global_text_replacements: list[TextReplacement] = [],
+        language_prior: LanguagePrior | None = None,
     ):
-        super().__init__(mode, global_text_replacements)
+        super().__init__(mode, global_text_replacements, language_prior)
 
-    def load_model(self):
-        self.model = WhisperModel(
-            model_size_or_path=self.mode.voice_model.name,
-            device="cuda",
-            local_files_only=True,
+    def get_model_key(self):
+        plan = compute_planner.get_plan(self.mode.voice_model)
+        return ModelKey(self.mode.voice_model.name, plan.device, plan.compute_type)
+
+    def load_model(self, warm_up: bool = False):
+        plan = compute_planner.get_plan(self.mode.voice_model)
+        self.model = voice_model_cache.get(
+            self.get_model_key(),
+            get_compute_size_mb(self.mode.voice_model, plan.compute_type),
+            lambda: WhisperModel(
+                model_size_or_path=plan.voice_model,
+                device=plan.device,
+                compute_type=plan.compute_type,
+                cpu_threads=plan.cpu_threads,
+                num_workers=plan.num_workers,
+                local_files_only=True,
+            ),
+            warm_up=warm_up,
         )
         logger.info(f"{self.mode.voice_model.name} loaded into memory")
 
+    def get_model_state(self):
+        return voice_model_cache.get_state(self.get_model_key())
+
     def unload_model(self):
-        del self.model
+        """Releases the model, which stays resident in the voice model cache"""
+        voice_model_cache.touch(self.get_model_key())
         self.model = None
-        gc.collect()
-        logger.info(f"{self.mode.voice_model.name} unloaded from memory")
+        logger.info(f"{self.mode.voice_model.name} released")
 
     def transcribe_audio(
         self,
-        file_name: str,
+        audio: str | np.ndarray,
+        initial_prompt: str | None = None,
+        on_segment: Callable[[SegmentMessage], None] | None = None,
+        cache_key: str | None = None,
+        cached: CachedTranscription | None = None,
     ):
-        if not self.model:
-            raise ModelNotLoadedException()
-        with open(file_name, "rb") as file:
-            logger.info(
-                f"Transcribing {file_name} using {self.mode.voice_model.name}, language: {self.get_voice_language()}"
+        """Transcribes a recording.
+
+        Args:
+            audio: Either the path to an audio file or 16 kHz mono float32 samples.
+            initial_prompt: Optional preceding text used as decoding context.
+            on_segment: Called with each segment as soon as it is decoded, after
+                the text replacements were applied to it.
+            cache_key: Stores the decoded transcription in the transcription cache.
+            cached: A cached transcription of the recording, used instead of decoding.
+        """
+        if isinstance(audio, np.ndarray):
+            source = f"{len(audio) / WHISPER_SAMPLE_RATE:.2f}s of in-memory audio"
+            return self._transcribe(
+                audio, source, initial_prompt, on_segment, cache_key, cached
             )
-            language = (
-                self.get_voice_language()
-                if self.get_voice_language() != "auto"
-                else None
+        with open(audio, "rb") as file:
+            return self._transcribe(
+                file, audio, initial_prompt, on_segment, cache_key, cached
             )
-            task = "transcribe" if not self.mode.translate_to_english else "translate"
-            logger.debug(f"Transcription task: {task}")
+
+    def get_language(self) -> str | None:
+        """Returns the language to decode in, or None to detect it"""
+        if self.get_voice_language() != "auto":
+            return self.get_voice_language()
+        return get_prior_language(self.language_prior)
+
+    def get_task(self) -> str:
+        return "transcribe" if not self.mode.translate_to_english else "translate"
+
+    def get_cache_key(
+        self, audio: str | np.ndarray, initial_prompt: str | None = None
+    ) -> str | None:
+        """Returns the transcription cache key of a recording, or None if caching is off"""
+        if not transcription_cache.enabled:
+            return None
+        if isinstance(audio, np.ndarray):
+            fingerprint = fingerprint_audio(audio)
+        else:
+            with open(audio, "rb") as file:
+                fingerprint = fingerprint_audio(file)
+        return transcription_cache.get_key(
+            fingerprint,
+            self.get_decoding_parameters(
+                self.get_language(), self.get_task(), initial_prompt
+            ),
+        )
+
+    def get_decoding_parameters(
+        self, language: str | None, task: str, initial_prompt: str | None
+    ) -> dict:
+        """Returns every parameter that influences the decoded text"""
+        plan = compute_planner.get_plan(self.mode.voice_model)
+        return {
+            "voice_model": self.mode.voice_model.name,
+            "compute_type": plan.compute_type,
+            "language": language,
+            "task": task,
+            "initial_prompt": initial_prompt,
+            **get_decoding_options(self.mode),
+        }
+
+    def _transcribe(
+        self,
+        audio: BinaryIO | np.ndarray,
+        source: str,
+        initial_prompt: str | None = None,
+        on_segment: Callable[[SegmentMessage], None] | None = None,
+        cache_key: str | None = None,
+        cached: CachedTranscription | None = None,
+    ):
+        logger.info(
+            f"Transcribing {source} using {self.mode.voice_model.name}, language: {self.get_voice_language()}"
+        )
+        language = self.get_language()
+        if language and self.get_voice_language() == "auto":
+            logger.debug(f"Skipping language detection, using prior: {language}")
+        task = self.get_task()
+        logger.debug(f"Transcription task: {task}")
+        decoding_options = get_decoding_options(self.mode)
+        logger.debug(
+            f"Decoding profile: {describe_decoding_profile(self.mode)}, {decoding_options}"
+        )
+
+        detection_time = None
+        if cached:
+            logger.info("Using cached transcription, skipping decoding")
+            segments, info = cached.segments, cached
+        else:
+            if not self.model:
+                raise ModelNotLoadedException()
+            voice_model_cache.claim(self.get_model_key())
+            start_time = time.time()
+            # Runs language detection up front, the segments are decoded lazily
             segments, info = self.model.transcribe(
-                file,
-                beam_size=5,
+                audio,
                 language=language,
-                vad_filter=True,
-                temperature=0.0,
                 task=task,
+                initial_prompt=initial_prompt,
+                **decoding_options,
             )
-            logger.debug(
-                f"Language: {info.language} ({info.language_probability * 100:.2f}%)"
+            if language is None:
+                detection_time = time.time() - start_time
+        logger.debug(
+            f"Language: {info.language} ({info.language_probability * 100:.2f}%)"
+        )
+        replacement_engine = replacement_engines.get(
+            self.mode, self.global_text_replacements
+        )
+        raw_transcription = ""
+        transcription = ""
+        decoded_segments: list[CachedSegment] = []
+        # The generator decodes lazily, each segment is available as soon as it is decoded
+        for index, segment in enumerate(segments):
+            raw_transcription += segment.text
+            decoded_segments.append(
+                CachedSegment(
+                    text=segment.text,
+                    start=segment.start,
+                    end=segment.end,
+                    avg_logprob=segment.avg_logprob,
+                )
             )
-            transcription = ""
-            for segment in segments:
-                transcription += segment.text
-            transcription = transcription.strip()
-            logger.info(f'Transcription: "{transcription}"')
-
-            text_replacements = (
-                self.global_text_replacements + self.mode.text_replacements
+            text = replacement_engine.apply(segment.text)
+            transcription += text
+            if on_segment:
+                on_segment(
+                    SegmentMessage(
+                        text=text, start=segment.start, end=segment.end, index=index
+                    )
+                )
+        if not cached:
+            voice_model_cache.mark_warm(self.get_model_key())
+        if cache_key and not cached:
+            transcription_cache.put(
+                cache_key,
+                CachedTranscription(
+                    language=info.language,
+                    language_probability=info.language_probability,
+                    segments=decoded_segments,
+                ),
             )
+        self.language_detection = LanguageDetection(
+            language=info.language,
+            probability=info.language_probability,
+            detected=language is None,
+            duration=detection_time,
+            avg_logprob=(
+                float(np.mean([segment.avg_logprob for segment in decoded_segments]))
+                if decoded_segments
+                else None
+            ),
+        )
+        raw_transcription = raw_transcription.strip()
+        transcription = transcription.strip()
+        logger.info(f'Transcription: "{raw_transcription}"')
+        if transcription != raw_transcription:
+            logger.info(f"Transcription after replacements: {transcription}")
 
-            logger.debug(f"Text replacements: {text_replacements}")
-            prev_transcription = transcription
-            for tr in text_replacements:
-                transcription = tr.apply_replacement(transcription)
-
-            if transcription != prev_transcription:
-                logger.info(f"Transcription after replacements: {transcription}")
-
-            # self.set_language(info.language)
-            return transcription
+        # self.set_language(info.language)
+        return transcription
@@ -3,5 +3,10 @@ Audio processing services for LocalFlow.
 
 This package contains:
 - AudioRecorder: Records audio from input devices
+- DeviceRegistry: Process-wide cache of the available input devices
+- AudioBuffer: Chunked capture buffer written from the recording callback
+- AudioLevelMeter: Computes and pushes audio levels off the audio callback
+- StreamingAudioWriter: Writes recordings to disk while they are captured
+- Processing: In-memory conversion of captured audio for the transcriber
 - Compressor: Compresses audio files using FFmpeg
 """
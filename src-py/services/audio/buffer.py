@@ -0,0 +1,148 @@
+import threading
+from typing import Optional
+import numpy as np
+
+
+class AudioBuffer:
+    """
+    Chunked capture buffer for float32 audio frames.
+
+    Frames are stored in a list of fixed-size chunks, so the PortAudio
+    callback only copies each block into place and a growing take is never
+    copied. A long-lived allocator thread prepares the next chunk once the
+    current one is half full; the callback only wakes it and takes the
+    prepared chunk, keeping allocations off the callback. Readers get a
+    contiguous array, which is a zero-copy view if the frames lie in a
+    single chunk.
+    """
+
+    def __init__(self, samplerate: float, channels: int = 1, chunk_seconds: int = 60):
+        self.samplerate = int(samplerate)
+        self.channels = channels
+        self.chunk_frames = self.samplerate * chunk_seconds
+        self._chunks = [self._allocate()]
+        self._spare: Optional[np.ndarray] = None
+        self._needs_spare = threading.Event()
+        self._closed = False
+        self._length = 0
+        self._lock = threading.Lock()
+        threading.Thread(target=self._allocate_spares, daemon=True).start()
+
+    def _allocate(self) -> np.ndarray:
+        chunk = np.empty((self.chunk_frames, self.channels), dtype=np.float32)
+        # Touch every page now instead of faulting them in on the callback
+        chunk.fill(0)
+        return chunk
+
+    def _allocate_spares(self):
+        while True:
+            self._needs_spare.wait()
+            self._needs_spare.clear()
+            if self._closed:
+                return
+            if self._spare is not None:
+                continue
+            spare = self._allocate()
+            with self._lock:
+                self._spare = spare
+
+    def _next_chunk(self) -> np.ndarray:
+        if self._spare is not None:
+            chunk, self._spare = self._spare, None
+            return chunk
+        # The helper thread fell behind, allocate on the callback as a last resort
+        return np.empty((self.chunk_frames, self.channels), dtype=np.float32)
+
+    def write(self, block: np.ndarray):
+        """Copy a block of frames into the buffer, starting a new chunk if needed"""
+        frames = len(block)
+        with self._lock:
+            written = 0
+            while written < frames:
+                index, position = divmod(self._length, self.chunk_frames)
+                if index == len(self._chunks):
+                    self._chunks.append(self._next_chunk())
+                count = min(frames - written, self.chunk_frames - position)
+                chunk = self._chunks[index]
+                chunk[position : position + count] = block[written : written + count]
+                written += count
+                self._length += count
+            position = self._length % self.chunk_frames
+            if self._spare is None and position >= self.chunk_frames // 2:
+                self._needs_spare.set()
+
+    def read(self, start: int = 0) -> np.ndarray:
+        """Returns the frames written since start as a contiguous array"""
+        with self._lock:
+            parts = []
+            for index in range(start // self.chunk_frames, len(self._chunks)):
+                begin = index * self.chunk_frames
+                if begin >= self._length:
+                    break
+                parts.append(
+                    self._chunks[index][
+                        max(start - begin, 0) : min(
+                            self._length - begin, self.chunk_frames
+                        )
+                    ]
+                )
+        if not parts:
+            return self._chunks[0][:0]
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def clear(self):
+        with self._lock:
+            # Keep the first chunk for the next take, release the rest
+            del self._chunks[1:]
+            self._length = 0
+
+    def close(self):
+        """Stops the allocator thread"""
+        self._closed = True
+        self._needs_spare.set()
+
+    @property
+    def duration(self) -> float:
+        return self._length / self.samplerate
+
+    def __len__(self):
+        return self._length
+
+
+class PrerollBuffer:
+    """
+    Fixed-size circular buffer holding the most recent frames.
+
+    Used by an armed recorder to keep the audio captured just before a
+    recording starts, so it can be prepended to the take.
+    """
+
+    def __init__(self, samplerate: float, seconds: float, channels: int = 1):
+        self.samplerate = int(samplerate)
+        self._data = np.zeros(
+            (max(1, int(self.samplerate * seconds)), channels), dtype=np.float32
+        )
+        self._written = 0
+
+    def write(self, block: np.ndarray):
+        size = len(self._data)
+        block = block[-size:]
+        start = self._written % size
+        first = min(len(block), size - start)
+        self._data[start : start + first] = block[:first]
+        self._data[: len(block) - first] = block[first:]
+        self._written += len(block)
+
+    def read(self) -> np.ndarray:
+        """Returns the buffered frames in chronological order"""
+        size = len(self._data)
+        if self._written < size:
+            return self._data[: self._written]
+        start = self._written % size
+        return np.concatenate((self._data[start:], self._data[:start]))
+
+    def clear(self):
+        self._written = 0
+
+    def __len__(self):
+        return min(self._written, len(self._data))
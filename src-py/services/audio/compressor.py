@@ -1,35 +1,124 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
 from ffmpeg import FFmpeg
 import os
+import time
+import numpy as np
 from loguru import logger
+from services.audio.processing import prepare_for_transcription
+from utils.environment import get_archive_format
 from utils.paths import get_temp_path
 
+# Output extension and FFmpeg options per archival codec
+ARCHIVE_CODECS: dict[str, tuple[str, dict]] = {
+    "flac": (".flac", {"ar": 16000, "ac": 1, "map": "0:a"}),
+    # Speech-tuned Opus, roughly a tenth of the size of FLAC
+    "opus": (
+        ".opus",
+        {"c:a": "libopus", "b:a": "24k", "application": "voip", "ac": 1, "map": "0:a"},
+    ),
+}
+
 
 class Compressor:
+    """
+    Produces the transcriber input and the archived recording.
+
+    The transcriber input is prepared in-process on the critical path, while
+    archival encoding with FFmpeg runs on a background executor in parallel
+    with transcription and language model processing.
+    """
+
     def __init__(self):
+        self.executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="compressor"
+        )
+        # Seconds the last background archive took, set before its future resolves
+        self.last_archive_time: Optional[float] = None
         logger.debug("Compressor initialized")
 
-    def compress(self, file_path: str):
+    def prepare(self, audio: np.ndarray, samplerate: int) -> np.ndarray:
+        """Converts captured audio into the transcriber input without touching disk"""
+        return prepare_for_transcription(audio, samplerate)
+
+    def compress(self, file_path: str, codec: str = "flac"):
         if not os.path.exists(file_path):
             logger.error(f"File {file_path} does not exist")
             return
-        logger.debug(f"Compressing {file_path}")
+        logger.debug(f"Compressing {file_path} to {codec}")
 
-        output_name = file_path.replace(".wav", ".flac")
+        extension, options = ARCHIVE_CODECS[codec]
+        output_name = os.path.splitext(file_path)[0] + extension
 
         ffmpeg = (
             FFmpeg()
+            .option("y")
             .input(file_path)
-            .output(output_name, ar=16000, ac=1, map="0:a")
+            .output(output_name, options)
             .option("v", "error")
         )
         ffmpeg.execute()
         logger.info(f"Compressed {file_path} to {output_name}")
         return output_name
 
-    def cleanup(self):
+    def compress_in_background(
+        self, file_path: str, write_source: Optional[Callable[[], None]] = None
+    ) -> "Future[Optional[str]]":
+        """Encodes the archive copy of a recording on the background executor.
+
+        Args:
+            file_path (str): Path of the WAV file to compress.
+            write_source (Callable, optional): Writes the WAV file before compressing it.
+
+        Returns:
+            Future: Resolves to the compressed file path, or None on failure.
+        """
+
+        archive_format = get_archive_format()
+
+        def archive():
+            start_time = time.time()
+            try:
+                if write_source:
+                    write_source()
+                if archive_format == "wav":
+                    return self.compress(file_path, "flac")
+                return self.compress(file_path, archive_format)
+            finally:
+                self.last_archive_time = time.time() - start_time
+
+        self.last_archive_time = None
+        return self.executor.submit(archive)
+
+    def wait(self, archive: Optional["Future[Optional[str]]"]):
+        """Waits for a background compression, returning its output if it succeeded"""
+        if not archive:
+            return None
+        try:
+            return archive.result()
+        except Exception as e:
+            logger.error(f"Archival compression failed: {e}")
+            return None
+
+    def get_archive_files(self, archive: Optional["Future[Optional[str]]"]):
+        """Waits for a background compression and lists the files to keep in the archive.
+
+        The uncompressed WAV is only kept if the archive format asks for it, or
+        as a fallback when compression failed.
+        """
+        compressed_file = self.wait(archive)
+        source_file = f"{get_temp_path()}/recording.wav"
+        if not compressed_file:
+            return [source_file]
+        if get_archive_format() == "wav":
+            return [source_file, compressed_file]
+        return [compressed_file]
+
+    def cleanup(self, archive: Optional["Future[Optional[str]]"] = None):
+        # Never delete files from under a running compression
+        self.wait(archive)
         temp_path = get_temp_path()
-        if os.path.exists(f"{temp_path}/recording.wav"):
-            os.remove(f"{temp_path}/recording.wav")
-        if os.path.exists(f"{temp_path}/recording.flac"):
-            os.remove(f"{temp_path}/recording.flac")
+        for file_name in os.listdir(temp_path):
+            if file_name.startswith("recording."):
+                os.remove(f"{temp_path}/{file_name}")
         logger.debug("Removed recording files")
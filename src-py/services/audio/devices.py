@@ -0,0 +1,114 @@
+import threading
+import time
+from typing import Optional
+import sounddevice as sd
+from loguru import logger
+from models.messages import Device
+
+
+class DeviceRegistry:
+    """
+    Process-wide cache of the available input devices.
+
+    Querying PortAudio can take hundreds of milliseconds on machines with
+    many virtual devices, so the device list is queried once and shared by
+    every recorder and IPC channel. A rescan re-initializes PortAudio to
+    pick up devices that were plugged in or removed; it runs when the device
+    list is requested, at most once per RESCAN_INTERVAL. A rescan can
+    renumber the devices, so it bumps the generation and recorders look
+    their device up by name again before opening a stream.
+    """
+
+    RESCAN_INTERVAL = 5  # seconds
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Held while PortAudio is re-initialized and while streams open or close
+        self.portaudio_lock = threading.RLock()
+        self.open_streams = 0
+        self.generation = 0
+        self.devices: list[Device] = []
+        self.default_device: Optional[Device] = None
+        self.updated_at = 0.0
+        self.rescanned_at = 0.0
+
+    def refresh(self, rescan: bool = False):
+        """Queries the devices synchronously.
+
+        Args:
+            rescan (bool): Re-initialize PortAudio to detect hotplugged devices.
+                Skipped while a stream is open.
+        """
+        start_time = time.time()
+        with self.portaudio_lock:
+            if rescan and self.open_streams:
+                logger.debug("Input stream open, skipping PortAudio rescan")
+                rescan = False
+            if rescan:
+                sd._terminate()
+                sd._initialize()
+            query = sd.query_devices()
+            input_devices = [
+                # TODO: Possible error source
+                Device(**device)  # type: ignore
+                for device in query
+                if device["max_input_channels"] > 0  # type: ignore
+            ]
+            default_device = Device(**query[sd.default.device[0]])  # type: ignore
+            for device in input_devices:
+                if device.index == default_device.index:
+                    device.is_default = True
+                    default_device.is_default = True
+                    break
+            else:
+                logger.warning(
+                    f"Default device {default_device.name} not found in input devices."
+                )
+            # Updated under the PortAudio lock so indices always match the open PortAudio
+            with self.lock:
+                self.devices = input_devices
+                self.default_device = default_device
+                self.updated_at = time.time()
+                if rescan:
+                    self.generation += 1
+                    self.rescanned_at = self.updated_at
+        logger.debug(
+            f"Queried {len(input_devices)} input devices in {time.time() - start_time:.3f}s"
+        )
+
+    def rescan_if_stale(self):
+        """Rescans synchronously, unless the last rescan was less than RESCAN_INTERVAL ago"""
+        if time.time() - self.rescanned_at >= self.RESCAN_INTERVAL:
+            self.refresh(rescan=True)
+
+    def ensure_loaded(self):
+        if not self.updated_at:
+            self.refresh()
+
+    def get_devices(self) -> list[Device]:
+        self.ensure_loaded()
+        with self.lock:
+            return [device.model_copy() for device in self.devices]
+
+    def get_default_device(self) -> Device:
+        self.ensure_loaded()
+        with self.lock:
+            assert self.default_device is not None
+            return self.default_device.model_copy()
+
+    def get_device(self, index: int) -> Optional[Device]:
+        """Returns the input device with the given PortAudio index"""
+        for device in self.get_devices():
+            if device.index == index:
+                return device
+        return None
+
+    def find_device(self, name: str) -> Optional[Device]:
+        """Returns the input device with the given name"""
+        for device in self.get_devices():
+            if device.name == name:
+                return device
+        return None
+
+
+device_registry = DeviceRegistry()
@@ -0,0 +1,121 @@
+import threading
+from typing import Optional
+import numpy as np
+from loguru import logger
+from api.ipc import print_message
+from models.messages import AudioLevelMessage
+
+SILENCE_DB = -120.0
+
+
+class AudioLevelMeter:
+    """
+    Computes audio levels outside of the real-time audio callback.
+
+    The callback only copies each block into a preallocated sample ring. A
+    consumer thread splits the new samples into fixed-size analysis blocks,
+    computes their RMS and peak levels in dBFS in one vectorized pass, keeps
+    them in a circular history and pushes an AudioLevelMessage at a fixed
+    frame rate.
+    """
+
+    def __init__(
+        self,
+        samplerate: float,
+        frame_rate: float = 15,
+        block_ms: int = 20,
+        history_length: int = 20,
+        ring_seconds: int = 2,
+    ):
+        self.samplerate = int(samplerate)
+        self.frame_rate = frame_rate
+        self.block_frames = max(1, self.samplerate * block_ms // 1000)
+        self.ring = np.zeros(self.samplerate * ring_seconds, dtype=np.float32)
+        self.write_position = 0
+        self.read_position = 0
+        # Columns: rms dBFS, peak dBFS, legacy audio level
+        self.history = np.full((history_length, 3), [SILENCE_DB, SILENCE_DB, 0.0])
+        self.history_index = 0
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def push(self, block: np.ndarray):
+        """Copies a block into the sample ring. Called from the audio callback."""
+        samples = block[:, 0] if block.ndim > 1 else block
+        size = len(self.ring)
+        samples = samples[-size:]
+        start = self.write_position % size
+        first = min(len(samples), size - start)
+        self.ring[start : start + first] = samples[:first]
+        self.ring[: len(samples) - first] = samples[first:]
+        self.write_position += len(samples)
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.read_position = self.write_position
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        self.history[:] = [SILENCE_DB, SILENCE_DB, 0.0]
+
+    def run(self):
+        interval = 1 / self.frame_rate if self.frame_rate > 0 else 0.1
+        while not self.stop_event.wait(interval):
+            try:
+                if self.update() and self.frame_rate > 0:
+                    print_message(self.get_message())
+            except Exception as e:
+                logger.error(f"Audio level metering failed: {e}")
+
+    def update(self) -> bool:
+        """Analyzes the samples written since the last update"""
+        size = len(self.ring)
+        write_position = self.write_position
+        available = min(write_position - self.read_position, size)
+        blocks = available // self.block_frames
+        if not blocks:
+            return False
+        frames = blocks * self.block_frames
+        start = (write_position - available) % size
+        indices = (start + np.arange(frames)) % size
+        analysis = self.ring[indices].reshape(blocks, self.block_frames)
+        self.read_position = write_position - available + frames
+
+        rms = np.sqrt(np.mean(np.square(analysis), axis=1))
+        peak = np.max(np.abs(analysis), axis=1)
+        levels = np.column_stack(
+            (
+                to_dbfs(rms),
+                to_dbfs(peak),
+                # Matches the scale of the former per-callback norm * 10
+                rms * np.sqrt(self.block_frames) * 10,
+            )
+        )
+        levels = levels[-len(self.history) :]
+        rows = (self.history_index + np.arange(len(levels))) % len(self.history)
+        self.history[rows] = levels
+        self.history_index = (self.history_index + len(levels)) % len(self.history)
+        return True
+
+    def get_audio_level(self) -> float:
+        return float(np.mean(self.history[:, 2]))
+
+    def get_message(self) -> AudioLevelMessage:
+        latest = self.history[(self.history_index - 1) % len(self.history)]
+        return AudioLevelMessage(
+            audio_level=self.get_audio_level(),
+            rms_db=float(latest[0]),
+            peak_db=float(latest[1]),
+        )
+
+
+def to_dbfs(values: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore"):
+        return np.maximum(20 * np.log10(values), SILENCE_DB)
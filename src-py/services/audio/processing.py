@@ -0,0 +1,25 @@
+from math import gcd
+import numpy as np
+from scipy.signal import resample_poly
+
+WHISPER_SAMPLE_RATE = 16000
+
+
+def prepare_for_transcription(audio: np.ndarray, samplerate: int) -> np.ndarray:
+    """Converts captured audio into the format expected by faster-whisper.
+
+    Args:
+        audio (np.ndarray): Captured frames, shaped (frames,) or (frames, channels).
+        samplerate (int): Sample rate of the captured frames.
+
+    Returns:
+        np.ndarray: Contiguous 16 kHz mono float32 samples.
+    """
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1) if audio.shape[1] > 1 else audio[:, 0]
+    if samplerate != WHISPER_SAMPLE_RATE:
+        divisor = gcd(samplerate, WHISPER_SAMPLE_RATE)
+        audio = resample_poly(
+            audio, WHISPER_SAMPLE_RATE // divisor, samplerate // divisor
+        )
+    return np.ascontiguousarray(audio, dtype=np.float32)
@@ -7,49 +7,31 @@ from threading import Thread
 from typing import Optional
 from loguru import logger
 import os
-from models.messages import Device
+from services.audio.buffer import AudioBuffer, PrerollBuffer
+from services.audio.devices import device_registry
+from services.audio.meter import AudioLevelMeter
+from services.audio.writer import StreamingAudioWriter
+from utils.environment import get_audio_level_frame_rate, is_spill_to_disk_enabled
 from utils.paths import get_temp_path
 
 
-class FloatStack:
-    def __init__(self, max_length=10):
-        self.stack: list[float] = []
-        self.max_length = max_length
-
-    def push(self, item: float):
-        if len(self.stack) >= self.max_length:
-            self.stack.pop(0)
-        self.stack.append(item)
-
-    def get(self):
-        return self.stack
-
-    def clear(self):
-        self.stack = []
-
-    def __len__(self):
-        return len(self.stack)
-
-    def __getitem__(self, key):
-        return self.stack[key]
-
-    def __iter__(self):
-        return iter(self.stack)
-
-
 class AudioRecorder:
     MAX_DURATION = 1800  # 30 minutes
 
     def __init__(self):
         logger.debug("Initializing AudioRecorder")
         self.recording = False
-        self.audio_data = []
-        self.devices = sd.query_devices()
-        self.device = Device(**self.devices[sd.default.device[0]])  # type: ignore
+        self.audio_buffer: Optional[AudioBuffer] = None
+        self.device = device_registry.get_default_device()
+        self.device_generation = device_registry.generation
         self.record_thread: Optional[Thread] = None
         self.stream: Optional[sd.InputStream] = None
-        self.current_audio_level: float = 0
-        self.audio_levels = FloatStack(max_length=20)
+        self.meter: Optional[AudioLevelMeter] = None
+        self.writer: Optional[StreamingAudioWriter] = None
+        self.preroll: Optional[PrerollBuffer] = None
+        self.preroll_ms = 0
+        self.capture_lock = threading.Lock()
+        self.stop_event = threading.Event()
         self.clear_temp_files()
         self.duration = -1
         logger.debug("AudioRecorder initialized")
@@ -68,48 +50,177 @@ class AudioRecorder:
         if self.recording:
             logger.warning("Recording already in progress.")
             return
+        self.resolve_device()
+        self.prepare_buffer()
+        if is_spill_to_disk_enabled():
+            self.writer = StreamingAudioWriter(
+                self.get_file_path(), self.device.default_samplerate
+            )
+        else:
+            self.writer = None
+        self.stop_event.clear()
+        self.start_time = time.time()
+        self.begin_capture()
         self.record_thread = threading.Thread(
             target=self.record_audio, args=(self.MAX_DURATION,)
         )
-        self.start_time = time.time()
         self.record_thread.start()
         logger.debug(
             f"Recording in thread {self.record_thread.name} for {self.MAX_DURATION} seconds."
         )
 
-    def record_audio(self, duration_seconds: int):
-        self.recording = True
+    def prepare_buffer(self):
+        samplerate = int(self.device.default_samplerate)
+        if self.audio_buffer and self.audio_buffer.samplerate == samplerate:
+            self.audio_buffer.clear()
+        else:
+            if self.audio_buffer:
+                self.audio_buffer.close()
+            self.audio_buffer = AudioBuffer(samplerate)
+        return self.audio_buffer
 
-        def audio_callback(indata, frames, time, status):
-            if status:
-                logger.warning(status)
+    def prepare_meter(self):
+        samplerate = int(self.device.default_samplerate)
+        if not self.meter or self.meter.samplerate != samplerate:
+            self.meter = AudioLevelMeter(
+                samplerate, frame_rate=get_audio_level_frame_rate()
+            )
+        return self.meter
+
+    def resolve_device(self):
+        """Looks the device up by name again if PortAudio was rescanned since"""
+        if self.device_generation == device_registry.generation:
+            return
+        self.device_generation = device_registry.generation
+        device = device_registry.find_device(self.device.name)
+        if not device:
+            device = device_registry.get_default_device()
+            logger.warning(
+                f"Device {self.device.name} no longer available, using {device.name}"
+            )
+        elif device.index != self.device.index:
+            logger.debug(
+                f"Device {device.name} moved from index {self.device.index} to {device.index}"
+            )
+        self.device = device
+
+    def open_stream(self):
+        # A rescan cannot start before the stream is registered as open
+        with device_registry.portaudio_lock:
+            self.resolve_device()
+            self.stream = sd.InputStream(
+                callback=self.audio_callback,
+                channels=1,
+                samplerate=self.device.default_samplerate,
+                device=self.device.index,
+            )
+            device_registry.open_streams += 1
+            try:
+                self.stream.start()
+            except Exception:
+                self.close_stream()
+                raise
+
+    def close_stream(self):
+        with device_registry.portaudio_lock:
+            if self.stream:
+                self.stream.stop()
+                self.stream.close()
+                self.stream = None
+                device_registry.open_streams -= 1
+
+    def audio_callback(self, indata, frames, time, status):
+        if status:
+            logger.warning(status)
+        with self.capture_lock:
             if self.recording:
-                self.audio_data.append(indata.copy())
-            self.current_audio_level = float(np.linalg.norm(indata) * 10)
-            self.audio_levels.push(self.current_audio_level)
-            # if self.current_audio_level > 10:
-            #     logger.debug(f"Audio level: {self.current_audio_level:.1f}")
-
-        self.stream = sd.InputStream(
-            callback=audio_callback,
-            channels=1,
-            samplerate=self.device.default_samplerate,
-            device=self.device.index,
-        )
-        with self.stream:
-            end_time = time.time() + duration_seconds
-            while self.recording and time.time() < end_time:
-                sd.sleep(100)
+                if self.writer:
+                    self.writer.put(indata)
+                elif self.audio_buffer:
+                    self.audio_buffer.write(indata)
+                if self.meter:
+                    self.meter.push(indata)
+            elif self.preroll:
+                self.preroll.write(indata)
+
+    def begin_capture(self):
+        meter = self.prepare_meter()
+        if self.writer:
+            self.writer.open()
+        with self.capture_lock:
+            if self.preroll and len(self.preroll):
+                preroll = self.preroll.read()
+                if self.writer:
+                    self.writer.put(preroll)
+                elif self.audio_buffer:
+                    self.audio_buffer.write(preroll)
+                logger.debug(
+                    f"Prepended {len(preroll) / self.preroll.samplerate:.2f}s of pre-roll"
+                )
+                self.preroll.clear()
+            self.recording = True
+        meter.start()
+
+    def end_capture(self):
+        with self.capture_lock:
+            self.recording = False
+        if self.meter:
+            self.meter.stop()
+        if self.writer:
+            self.writer.close()
+
+    def record_audio(self, duration_seconds: int):
+        try:
+            if not self.armed:
+                self.open_stream()
+            self.stop_event.wait(duration_seconds)
+        finally:
+            self.end_capture()
+            if not self.armed:
+                self.close_stream()
 
-        self.recording = False
         self.duration = time.time() - self.start_time
         logger.debug(f"Recording stopped after {self.duration:.2f} seconds.")
 
+    @property
+    def armed(self):
+        return self.preroll is not None
+
+    def arm(self, preroll_ms: int = 500):
+        """Keeps the input stream open between recordings with a rolling pre-roll"""
+        if self.armed:
+            return
+        self.preroll_ms = preroll_ms
+        self.resolve_device()
+        self.preroll = PrerollBuffer(self.device.default_samplerate, preroll_ms / 1000)
+        try:
+            self.open_stream()
+        except Exception:
+            self.preroll = None
+            raise
+        logger.info(
+            f"Input stream armed on {self.device.name} ({preroll_ms} ms pre-roll)"
+        )
+
+    def disarm(self):
+        if not self.armed:
+            return
+        if self.recording:
+            self.interrupt_recording()
+        self.close_stream()
+        self.preroll = None
+        logger.info("Input stream disarmed")
+
+    def reset(self):
+        """Discards the current take while keeping the selected device"""
+        if self.audio_buffer:
+            self.audio_buffer.clear()
+        self.clear_temp_files()
+        self.duration = -1
+
     def interrupt_recording(self):
         if self.recording:
-            self.recording = False
-            if self.stream:
-                self.stream.stop()
+            self.stop_event.set()
             logger.info("Recording aborted.")
             if self.record_thread:
                 self.record_thread.join()
@@ -117,9 +228,10 @@ class AudioRecorder:
         else:
             logger.warning("No recording in progress.")
 
-    def stop(self):
+    def stop(self, save: bool = True):
         self.interrupt_recording()
-        self.save_audio()
+        if save:
+            self.save_audio()
 
     def get_duration(self):
         if self.recording:
@@ -135,20 +247,29 @@ class AudioRecorder:
         file_path = f"{get_temp_path()}/recording.wav"
         return file_path
 
+    def get_audio(self, start: int = 0) -> Optional[np.ndarray]:
+        """Returns the captured frames from start on, or None if nothing was captured"""
+        if not self.audio_buffer or not len(self.audio_buffer):
+            return None
+        return self.audio_buffer.read(start)
+
     def save_audio(self):
-        if not self.audio_data:
+        if self.writer:
+            # Already written while recording
+            return
+
+        audio_data = self.get_audio()
+        if audio_data is None:
             logger.warning("No audio data to save.")
             return
 
-        audio_data = np.concatenate(self.audio_data, axis=0)
         file_path = f"{get_temp_path()}/recording.wav"
-        wavfile.write(file_path, int(self.device.default_samplerate), audio_data)
+        wavfile.write(file_path, self.audio_buffer.samplerate, audio_data)  # type: ignore
         logger.info(f"Audio saved to {file_path}.")
-        self.audio_data = []
 
     def get_audio_level(self):
-        if self.audio_levels:
-            return float(np.mean(self.audio_levels.get()))
+        if self.meter:
+            return self.meter.get_audio_level()
         else:
             return 0
 
@@ -156,30 +277,22 @@ class AudioRecorder:
         pass
 
     def get_devices(self):
-        devices = sd.query_devices()
-        input_devices = [
-            # TODO: Possible error source
-            Device(**device)  # type: ignore
-            for device in devices
-            if device["max_input_channels"] > 0  # type: ignore
-        ]
-        default_device = Device(**self.devices[sd.default.device[0]])  # type: ignore
-        if default_device.index in [device.index for device in input_devices]:
-            index = [device.index for device in input_devices].index(
-                default_device.index
-            )
-            input_devices[index].is_default = True
-        else:
-            logger.warning(
-                f"Default device {default_device.name} not found in input devices."
-            )
-        return input_devices
+        return device_registry.get_devices()
 
     def get_device(self):
         return self.device
 
     def set_device(self, index):
-        devices = self.get_devices()
-        self.device = devices[index]
+        device = device_registry.get_device(index)
+        if not device:
+            logger.warning(f"Device {index} not found, keeping {self.device.name}")
+            return self.device
+        armed = self.armed
+        if armed:
+            self.disarm()
+        self.device = device
+        self.device_generation = device_registry.generation
+        if armed:
+            self.arm(self.preroll_ms)
         logger.info(f"Using device: {self.device.name}")
         return self.device
@@ -0,0 +1,68 @@
+import queue
+import threading
+import wave
+from typing import Optional
+import numpy as np
+from loguru import logger
+
+
+class StreamingAudioWriter:
+    """
+    Encodes captured blocks to a 16-bit PCM WAV file while recording.
+
+    The audio callback hands blocks to a bounded queue and a writer thread
+    appends them to the file, so resident memory stays bounded regardless of
+    the recording length and the file is complete as soon as it is closed.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        samplerate: float,
+        channels: int = 1,
+        max_queued_blocks: int = 256,
+    ):
+        self.file_path = file_path
+        self.samplerate = int(samplerate)
+        self.channels = channels
+        self.blocks: queue.Queue[Optional[np.ndarray]] = queue.Queue(
+            maxsize=max_queued_blocks
+        )
+        self.dropped_blocks = 0
+        self.frames_written = 0
+        self.thread: Optional[threading.Thread] = None
+
+    def open(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        logger.debug(f"Streaming audio to {self.file_path}")
+
+    def put(self, block: np.ndarray):
+        """Queues a copy of a block. Called from the audio callback, never blocks."""
+        try:
+            self.blocks.put_nowait(block.copy())
+        except queue.Full:
+            self.dropped_blocks += 1
+
+    def run(self):
+        with wave.open(self.file_path, "wb") as file:
+            file.setnchannels(self.channels)
+            file.setsampwidth(2)
+            file.setframerate(self.samplerate)
+            while (block := self.blocks.get()) is not None:
+                pcm = np.clip(block, -1.0, 1.0) * np.iinfo(np.int16).max
+                file.writeframes(pcm.astype("<i2").tobytes())
+                self.frames_written += len(block)
+
+    def close(self):
+        """Flushes the queued blocks and finalizes the file"""
+        if not self.thread:
+            return
+        self.blocks.put(None)
+        self.thread.join()
+        self.thread = None
+        if self.dropped_blocks:
+            logger.warning(f"Dropped {self.dropped_blocks} blocks while writing")
+        logger.info(
+            f"Streamed {self.frames_written / self.samplerate:.2f}s of audio to {self.file_path}"
+        )
@@ -3,4 +3,6 @@ Storage services for LocalFlow.
 
 This package contains:
 - DatabaseManager: Manages SQLite database using SQLModel
+- TranscriptionCache: Persists raw transcriptions of previously decoded audio
+- Archive migration: Converts archived recordings to a single compact file
 """
@@ -0,0 +1,111 @@
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pydantic import BaseModel
+from loguru import logger
+from services.audio.compressor import ARCHIVE_CODECS, Compressor
+from utils.paths import get_results_path
+
+
+class ArchiveMigrationReport(BaseModel):
+    converted: int = 0
+    skipped: int = 0
+    failed: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+
+    @property
+    def bytes_reclaimed(self) -> int:
+        return self.bytes_before - self.bytes_after
+
+
+def get_recordings(result_location: str) -> list[str]:
+    return sorted(
+        os.path.join(result_location, file_name)
+        for file_name in os.listdir(result_location)
+        if file_name.startswith("recording.")
+    )
+
+
+def migrate_result(
+    compressor: Compressor, result_location: str, codec: str
+) -> tuple[str, int, int]:
+    """Converts the recordings of a single result folder to a single archive file.
+
+    Returns:
+        tuple: The outcome ("converted", "skipped" or "failed") and the size of
+            the folder's recordings before and after.
+    """
+    recordings = get_recordings(result_location)
+    size_before = sum(os.path.getsize(path) for path in recordings)
+    extension, _ = ARCHIVE_CODECS[codec]
+    target = os.path.join(result_location, "recording" + extension)
+    if not recordings or recordings == [target]:
+        return "skipped", size_before, size_before
+
+    # Prefer the uncompressed source, then any other existing recording
+    sources = [path for path in recordings if path != target]
+    source = next((path for path in sources if path.endswith(".wav")), sources[0])
+    try:
+        if not os.path.exists(target):
+            compressor.compress(source, codec)
+        if not os.path.exists(target) or not os.path.getsize(target):
+            raise RuntimeError(f"No output written to {target}")
+    except Exception as e:
+        logger.error(f"Could not migrate {result_location}: {e}")
+        return "failed", size_before, size_before
+
+    for path in sources:
+        os.remove(path)
+    return "converted", size_before, os.path.getsize(target)
+
+
+def migrate_results(codec: str = "flac", workers: int | None = None):
+    """Converts every result folder to the given archival codec.
+
+    Each folder ends up with a single recording in that codec. The other
+    recordings are deleted only after the new file was written successfully.
+
+    Args:
+        codec (str): One of the keys of ARCHIVE_CODECS.
+        workers (int, optional): Number of parallel FFmpeg processes.
+
+    Returns:
+        ArchiveMigrationReport: Counts and sizes of the migrated folders.
+    """
+    if codec not in ARCHIVE_CODECS:
+        raise ValueError(f"Unknown archival codec: {codec}")
+    results_path = get_results_path()
+    locations = [
+        os.path.join(results_path, name)
+        for name in os.listdir(results_path)
+        if os.path.isdir(os.path.join(results_path, name))
+    ]
+    logger.info(f"Migrating {len(locations)} results to {codec}")
+
+    compressor = Compressor()
+    report = ArchiveMigrationReport()
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        outcomes = executor.map(
+            lambda location: migrate_result(compressor, location, codec), locations
+        )
+        for outcome, size_before, size_after in outcomes:
+            setattr(report, outcome, getattr(report, outcome) + 1)
+            report.bytes_before += size_before
+            report.bytes_after += size_after
+
+    logger.info(
+        f"Converted {report.converted}, skipped {report.skipped}, failed {report.failed}. "
+        f"Reclaimed {report.bytes_reclaimed / 1024**2:.1f} MB"
+    )
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Convert archived recordings to a single compact file per result"
+    )
+    parser.add_argument("--codec", choices=list(ARCHIVE_CODECS), default="flac")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    migrate_results(args.codec, args.workers)
@@ -1,26 +1,33 @@
 import os
+from typing import Callable
 from uuid import UUID
 
 from sqlmodel import SQLModel, create_engine, Session, select, desc
+from sqlalchemy import inspect, literal, text
 from sqlalchemy.orm import subqueryload
 from models.db import (
     Example,
     ExampleBase,
     LanguageModel,
+    LanguagePrior,
     Mode,
+    ModeBase,
     ModeCreate,
     ModeUpdate,
     Prompt,
     Result,
+    ResultTiming,
     TextReplacement,
     TextReplacementBase,
     VoiceModel,
 )
+from services.ai.examples import example_selector
+from services.ai.ollama_client import ollama_client
+from services.ai.prompt_cache import prompt_prefix_cache
+from services.ai.replacements import replacement_engines
 from utils.paths import get_temp_path, get_user_data_path
 from loguru import logger
 
-import ollama
-
 
 class DatabaseManager:
     def __init__(self, echo=False):
@@ -31,6 +38,7 @@ class DatabaseManager:
                 f.write("")
         self.engine = create_engine(f"sqlite:///{sql_file_name}", echo=echo)
         SQLModel.metadata.create_all(self.engine)
+        self.add_missing_columns()
         self.create_voice_models()
         self.create_language_models()
         self.create_default_modes()
@@ -42,6 +50,27 @@ class DatabaseManager:
     def create_session(self):
         return Session(self.engine)
 
+    def add_missing_columns(self):
+        """Adds columns introduced after a table was created, using their defaults"""
+        inspector = inspect(self.engine)
+        with self.engine.begin() as connection:
+            for table in SQLModel.metadata.sorted_tables:
+                existing = {c["name"] for c in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name in existing:
+                        continue
+                    column_type = column.type.compile(dialect=self.engine.dialect)
+                    statement = f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'
+                    default = column.default
+                    if default is not None and default.is_scalar:
+                        default_value = literal(default.arg).compile(  # type: ignore
+                            dialect=self.engine.dialect,
+                            compile_kwargs={"literal_binds": True},
+                        )
+                        statement += f" DEFAULT {default_value}"
+                    connection.execute(text(statement))
+                    logger.info(f"Added column {table.name}.{column.name}")
+
     def create_voice_models(self):
         with self.create_session() as session:
             created_models = []
@@ -89,7 +118,7 @@ class DatabaseManager:
             session.commit()
 
     def create_language_models(self):
-        list_response = ollama.list()
+        list_response = ollama_client.list_models()
         models = list_response.models
         with self.create_session() as session:
             existing_models = session.exec(select(LanguageModel)).all()
@@ -243,6 +272,8 @@ class DatabaseManager:
             text_replacement = TextReplacement(
                 original_text=text_replacement.original_text,
                 replacement_text=text_replacement.replacement_text,
+                whole_word=text_replacement.whole_word,
+                case_insensitive=text_replacement.case_insensitive,
                 mode_id=None,
             )
             session.add(text_replacement)
@@ -268,10 +299,13 @@ class DatabaseManager:
             new_text_replacement = TextReplacement(
                 original_text=text_replacement.original_text,
                 replacement_text=text_replacement.replacement_text,
+                whole_word=text_replacement.whole_word,
+                case_insensitive=text_replacement.case_insensitive,
                 mode_id=None,
             )
             session.add(new_text_replacement)
             session.commit()
+            replacement_engines.invalidate()
             logger.info(f"Text replacement created: {new_text_replacement.id}")
             return new_text_replacement
 
@@ -285,8 +319,21 @@ class DatabaseManager:
                 raise Exception(f"Text replacement not found: {text_replacement_id}")
             session.delete(text_replacement)
             session.commit()
+            replacement_engines.invalidate(text_replacement.mode_id)
             logger.info(f"Text replacement deleted: {text_replacement.id}")
 
+    def get_language_prior(self, mode_id: UUID) -> LanguagePrior | None:
+        with self.create_session() as session:
+            return session.get(LanguagePrior, mode_id)
+
+    def save_language_prior(self, language_prior: LanguagePrior):
+        with self.create_session() as session:
+            language_prior = session.merge(language_prior)
+            session.commit()
+            session.refresh(language_prior)
+            logger.debug(f"Language prior saved: {language_prior}")
+            return language_prior
+
     def get_voice_model_by_name(self, voice_model_name: str) -> VoiceModel:
         with self.create_session() as session:
             voice_model = session.exec(
@@ -317,16 +364,10 @@ class DatabaseManager:
         with self.create_session() as session:
             # Create the new mode
             new_mode = Mode(
-                name=mode.name,
-                voice_language=mode.voice_language,
+                **mode.model_dump(include=set(ModeBase.model_fields)),
                 voice_model=voice_model,
                 voice_model_id=voice_model.id,
                 language_model_id=mode.language_model_name,
-                use_language_model=mode.use_language_model,
-                default=mode.default,
-                active=mode.active,
-                record_system_audio=mode.record_system_audio,
-                translate_to_english=mode.translate_to_english,
                 text_replacements=text_replacements,
             )
             if mode.prompt:
@@ -474,6 +515,12 @@ class DatabaseManager:
             session.add(mode)
             session.commit()
             session.refresh(mode)
+            if "text_replacements" in mode_update.model_fields_set:
+                replacement_engines.invalidate(mode.id)
+            if "prompt" in mode_update.model_fields_set:
+                prompt_id = mode.prompt.id if mode.prompt else None
+                prompt_prefix_cache.invalidate(prompt_id)
+                example_selector.invalidate(prompt_id)
             logger.info(f"Mode updated: {mode.id}")
             return mode
 
@@ -499,20 +546,40 @@ class DatabaseManager:
                     raise Exception("No default mode found to switch to")
 
             # Delete the mode
+            language_prior = session.get(LanguagePrior, mode.id)
+            if language_prior:
+                session.delete(language_prior)
             session.delete(mode)
             session.commit()
+            replacement_engines.invalidate(mode.id)
+            prompt_prefix_cache.invalidate()
+            example_selector.invalidate()
             logger.info(f"Mode deleted: {mode.id}")
 
-    def save_result(self, result: Result):
-        # Copy the temp files to the results folder
-        temp_location = get_temp_path()
+    def save_result(
+        self,
+        result: Result,
+        get_archive_files: Callable[[], list[str]] | None = None,
+    ):
+        # The archive may still be encoding in the background
+        if get_archive_files:
+            archive_files = get_archive_files()
+        else:
+            temp_location = get_temp_path()
+            archive_files = [
+                f"{temp_location}/recording.wav",
+                f"{temp_location}/recording.flac",
+            ]
+
+        # Move the archived temp files to the results folder
         result_location = result.location
 
         os.makedirs(result_location, exist_ok=True)
-        os.rename(f"{temp_location}/recording.wav", f"{result_location}/recording.wav")
-        os.rename(
-            f"{temp_location}/recording.flac", f"{result_location}/recording.flac"
-        )
+        for file_path in archive_files:
+            if os.path.exists(file_path):
+                os.rename(file_path, f"{result_location}/{os.path.basename(file_path)}")
+            else:
+                logger.warning(f"{file_path} not found, not archived")
 
         # Save the result to the database
         with self.create_session() as session:
@@ -521,6 +588,12 @@ class DatabaseManager:
             logger.info(f"Result saved: {result.id}")
         return result
 
+    def save_result_timing(self, result_timing: ResultTiming):
+        with self.create_session() as session:
+            session.add(result_timing)
+            session.commit()
+            logger.debug(f"Result timing saved: {result_timing.result_id}")
+
     def delete_result(self, result_id: UUID):
         with self.create_session() as session:
             # Get the result to delete
@@ -530,6 +603,9 @@ class DatabaseManager:
                 raise Exception(f"Result not found: {result_id}")
 
             # Delete the result
+            result_timing = session.get(ResultTiming, result.id)
+            if result_timing:
+                session.delete(result_timing)
             session.delete(result)
             session.commit()
             logger.info(f"Result deleted: {result.id}")
@@ -557,6 +633,8 @@ class DatabaseManager:
             )
             session.add(new_example)
             session.commit()
+            prompt_prefix_cache.invalidate(prompt.id)
+            example_selector.add(prompt.id, new_example)
             logger.info(f"Example added: {new_example.id}")
             return new_example
 
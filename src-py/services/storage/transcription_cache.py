@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO
+import numpy as np
+from loguru import logger
+from pydantic import BaseModel
+from utils.environment import get_transcription_cache_mb
+from utils.paths import get_cache_path
+
+
+class CachedSegment(BaseModel):
+    text: str
+    start: float
+    end: float
+    avg_logprob: float
+
+
+class CachedTranscription(BaseModel):
+    language: str
+    language_probability: float
+    segments: list[CachedSegment]
+
+
+def fingerprint_audio(audio: BinaryIO | np.ndarray) -> str:
+    """Returns the SHA-256 of the audio samples or file contents"""
+    digest = hashlib.sha256()
+    if isinstance(audio, np.ndarray):
+        digest.update(np.ascontiguousarray(audio).view(np.uint8))
+        return digest.hexdigest()
+    position = audio.tell()
+    while block := audio.read(1024 * 1024):
+        digest.update(block)
+    audio.seek(position)
+    return digest.hexdigest()
+
+
+class TranscriptionCache:
+    """
+    Persists raw transcriptions of previously decoded audio.
+
+    Entries are addressed by the fingerprint of the audio and every parameter
+    that influences decoding, so retries and re-processing of the same
+    recording skip the voice model. Each entry is a JSON file in the user
+    data cache directory; reading an entry updates its modification time and
+    the least recently used entries are deleted once the cache exceeds its
+    size budget. Entries are written and the cache trimmed on a background
+    thread, off the dictation's critical path.
+    """
+
+    def __init__(self, budget_mb: int = get_transcription_cache_mb()):
+        self.budget_bytes = budget_mb * 1024 * 1024
+        self.cache_path = os.path.join(get_cache_path(), "transcriptions")
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="transcription-cache"
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget_bytes > 0
+
+    def get_key(self, fingerprint: str, parameters: dict[str, Any]) -> str:
+        parameters_json = json.dumps(parameters, sort_keys=True, default=str)
+        return hashlib.sha256(f"{fingerprint}:{parameters_json}".encode()).hexdigest()
+
+    def get_file_path(self, key: str) -> str:
+        return os.path.join(self.cache_path, f"{key}.json")
+
+    def get(self, key: str) -> CachedTranscription | None:
+        if not self.enabled:
+            return None
+        file_path = self.get_file_path(key)
+        try:
+            with open(file_path) as file:
+                cached = CachedTranscription.model_validate_json(file.read())
+            os.utime(file_path)
+            return cached
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cached transcription {key}: {e}")
+            os.remove(file_path)
+            return None
+
+    def put(self, key: str, transcription: CachedTranscription):
+        """Stores an entry on the background thread"""
+        if not self.enabled:
+            return
+        self.executor.submit(self.write, key, transcription)
+
+    def write(self, key: str, transcription: CachedTranscription):
+        try:
+            os.makedirs(self.cache_path, exist_ok=True)
+            file_path = self.get_file_path(key)
+            temp_file_path = f"{file_path}.{threading.get_ident()}.tmp"
+            with open(temp_file_path, "w") as file:
+                file.write(transcription.model_dump_json())
+            os.replace(temp_file_path, file_path)
+            self.trim()
+        except Exception as e:
+            logger.warning(f"Could not cache transcription {key}: {e}")
+
+    def trim(self):
+        """Deletes the least recently used entries until the cache fits its budget"""
+        with self.lock:
+            entries = []
+            for entry in os.scandir(self.cache_path):
+                if entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total_bytes = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total_bytes <= self.budget_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total_bytes -= size
+                logger.debug(f"Evicted cached transcription {os.path.basename(path)}")
+
+
+transcription_cache = TranscriptionCache()
@@ -7,3 +7,68 @@ def is_production_environment():
 
 def get_log_level():
     return os.environ.get("LOG_LEVEL", "DEBUG")
+
+
+def is_in_memory_audio_enabled():
+    """Transcribe straight from the recorder buffer instead of the compressed file"""
+    return os.environ.get("IN_MEMORY_AUDIO", "true") == "true"
+
+
+def is_live_transcription_enabled():
+    """Transcribe finished chunks in the background while recording"""
+    return os.environ.get("LIVE_TRANSCRIPTION", "false") == "true"
+
+
+def get_audio_level_frame_rate():
+    """Frames per second at which audio levels are pushed to the frontend"""
+    return float(os.environ.get("AUDIO_LEVEL_FPS", "15"))
+
+
+def is_spill_to_disk_enabled():
+    """Stream recordings to disk while recording instead of buffering them in memory"""
+    return os.environ.get("SPILL_TO_DISK", "false") == "true"
+
+
+def is_armed_recording_enabled():
+    """Keep the input stream open between recordings"""
+    return os.environ.get("ARMED_RECORDING", "false") == "true"
+
+
+def get_preroll_ms():
+    """Milliseconds of audio before the toggle that are prepended to a recording"""
+    return int(os.environ.get("PREROLL_MS", "500"))
+
+
+def get_archive_format():
+    """Format recordings are archived in: "flac", "opus" or "wav" (WAV and FLAC)"""
+    return os.environ.get("ARCHIVE_FORMAT", "flac")
+
+
+def get_voice_model_cache_budget_mb():
+    """Memory budget for voice models kept loaded between dictations"""
+    return int(os.environ.get("VOICE_MODEL_CACHE_MB", "4096"))
+
+
+def get_voice_model_idle_ttl():
+    """Seconds a loaded voice model may stay unused before it is unloaded"""
+    return float(os.environ.get("VOICE_MODEL_IDLE_TTL", "900"))
+
+
+def get_language_model_idle_ttl():
+    """Seconds a language model stays loaded in Ollama after its last use"""
+    return float(os.environ.get("LANGUAGE_MODEL_IDLE_TTL", "900"))
+
+
+def get_example_token_budget():
+    """Approximate tokens of few-shot examples sent per request before examples are selected"""
+    return int(os.environ.get("EXAMPLE_TOKEN_BUDGET", "1500"))
+
+
+def is_model_warm_up_enabled():
+    """Run a short clip through voice models right after loading them"""
+    return os.environ.get("MODEL_WARM_UP", "true") == "true"
+
+
+def get_transcription_cache_mb():
+    """Disk budget for cached transcriptions of previously seen audio, 0 disables it"""
+    return int(os.environ.get("TRANSCRIPTION_CACHE_MB", "64"))
@@ -0,0 +1,45 @@
+import ctypes
+import os
+import platform
+from loguru import logger
+
+
+def get_available_memory_mb() -> int | None:
+    """
+    Get the amount of physical memory available to new allocations.
+
+    Returns:
+        Available memory in MB, or None if it cannot be determined
+    """
+    try:
+        system = platform.system()
+        if system == "Linux":
+            with open("/proc/meminfo") as file:
+                for line in file:
+                    if line.startswith("MemAvailable:"):
+                        return int(line.split()[1]) // 1024
+        elif system == "Windows":
+
+            class MemoryStatus(ctypes.Structure):
+                _fields_ = [
+                    ("dwLength", ctypes.c_ulong),
+                    ("dwMemoryLoad", ctypes.c_ulong),
+                    ("ullTotalPhys", ctypes.c_ulonglong),
+                    ("ullAvailPhys", ctypes.c_ulonglong),
+                    ("ullTotalPageFile", ctypes.c_ulonglong),
+                    ("ullAvailPageFile", ctypes.c_ulonglong),
+                    ("ullTotalVirtual", ctypes.c_ulonglong),
+                    ("ullAvailVirtual", ctypes.c_ulonglong),
+                    ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+                ]
+
+            status = MemoryStatus()
+            status.dwLength = ctypes.sizeof(MemoryStatus)
+            ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status))  # type: ignore
+            return status.ullAvailPhys // 1024**2
+        elif system == "Darwin":
+            # Free pages only, a conservative estimate
+            return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // 1024**2
+    except Exception as e:
+        logger.warning(f"Could not determine available memory: {e}")
+    return None
@@ -75,3 +75,16 @@ def get_results_path() -> str:
     os.makedirs(results_path, exist_ok=True)
 
     return results_path
+
+
+def get_cache_path() -> str:
+    """
+    Get the path where cached intermediate results are stored.
+
+    Returns:
+        Path to cache directory
+    """
+    cache_path = os.path.join(get_user_data_path(), "cache")
+    os.makedirs(cache_path, exist_ok=True)
+
+    return cache_path
@@ -15,24 +15,19 @@ const SpeechVocalization = ({ isRecording }: { isRecording: boolean }) => {
   }, [audioLevel]);
 
   useEffect(() => {
-    if (isRecording) {
-      const interval = setInterval(() => {
-        window.mini.requestAudioLevel();
-        console.log("Requesting audio level");
-      }, 500);
-
-      return () => clearInterval(interval);
+    if (!isRecording) {
+      setAudioLevel(0);
+      return;
     }
-  }, [isRecording]);
 
-  useEffect(() => {
+    // Levels are pushed by the Python backend while recording
     const unsubscribe = window.mini.onReceiveAudioLevel((audioLevel) => {
       console.log("Audio level", audioLevel);
       setAudioLevel(audioLevel);
     });
 
     return () => unsubscribe();
-  }, []);
+  }, [isRecording]);
 
   console.log("Audio level", audioLevel);
 
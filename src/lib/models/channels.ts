@@ -1,6 +1,6 @@
 // IPC channel constants for communication between renderer and main processes
 
-import { ControllerStatusType } from "./messages";
+import { ControllerStatusType, SegmentMessage } from "./messages";
 import {
   Device,
   ModeCreate,
@@ -291,6 +291,7 @@ export enum PythonEvents {
   MODES = "modes",
   RESULT = "result",
   TRANSCRIPTION = "transcription",
+  SEGMENT = "segment",
 }
 
 // Define the mapping between event names and their payload types
@@ -302,4 +303,5 @@ export type PythonEventMap = {
   [PythonEvents.MODES]: Mode[];
   [PythonEvents.RESULT]: Result;
   [PythonEvents.TRANSCRIPTION]: string;
+  [PythonEvents.SEGMENT]: SegmentMessage;
 };
@@ -28,6 +28,8 @@ export const languageNameMap: Record<LanguageType, string> = {
 
 export type VoiceModelType = "large-v3-turbo" | "large-v3" | "distil-large-v3";
 
+export type DecodingProfileType = "fast" | "balanced" | "accurate" | "custom";
+
 // Device is not technically in the database
 export interface Device {
   index: number;
@@ -44,6 +46,14 @@ export interface ModeBase {
   translate_to_english: boolean;
   record_system_audio: boolean;
   use_language_model: boolean;
+  decoding_profile?: DecodingProfileType;
+  // Only used by the custom decoding profile
+  beam_size?: number;
+  best_of?: number;
+  patience?: number;
+  condition_on_previous_text?: boolean;
+  vad_threshold?: number;
+  vad_min_silence_duration_ms?: number;
 }
 
 export interface Mode extends ModeBase {
@@ -114,6 +124,8 @@ export interface Example extends ExampleBase {
 export interface TextReplacementBase {
   original_text: string;
   replacement_text: string;
+  whole_word?: boolean;
+  case_insensitive?: boolean;
 }
 
 export interface TextReplacement extends TextReplacementBase {
@@ -128,6 +140,7 @@ export interface ResultBase {
   ai_result?: string;
   duration: number;
   processing_time: number;
+  decoding_profile?: string;
 }
 
 export interface Result extends ResultBase {
@@ -135,3 +148,19 @@ export interface Result extends ResultBase {
   mode: Mode;
   location: string;
 }
+
+// Seconds spent in each stage of the workflow that produced a result
+export interface ResultTiming {
+  stop?: number | null;
+  compress?: number | null;
+  voice_model_load?: number | null;
+  decode?: number | null;
+  language_detection?: number | null;
+  language_model_load?: number | null;
+  prompt_eval?: number | null;
+  generation?: number | null;
+  save?: number | null;
+  prompt_tokens?: number | null;
+  eval_tokens?: number | null;
+  tokens_per_second?: number | null;
+}
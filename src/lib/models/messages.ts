@@ -1,6 +1,6 @@
 // Message types for Python to Electron IPC
 import { PythonChannelFunction, PythonChannel } from "./channels";
-import { Result } from "./database";
+import { Result, ResultTiming } from "./database";
 
 // ---------- Update ----------
 
@@ -19,6 +19,8 @@ export interface ExceptionMessage {
 
 export interface AudioLevelMessage {
   audio_level: number;
+  rms_db?: number | null;
+  peak_db?: number | null;
   updateKind: "audio_level";
 }
 
@@ -38,21 +40,35 @@ export type ControllerStatusType =
   | "saving"
   | "result";
 
+export type VoiceModelStateType = "cold" | "warm";
+
 export interface StatusMessage {
   status: ControllerStatusType;
+  // Whether the voice model has already run its warm-up inference
+  voice_model_state?: VoiceModelStateType | null;
   updateKind: "status";
 }
 
 export interface ResultMessage {
   result: Result;
+  timing?: ResultTiming | null;
   updateKind: "result";
 }
 
 export interface TranscriptionMessage {
   transcription: string;
+  sequence?: number | null; // position of the frame within a coalesced stream
   updateKind: "transcription";
 }
 
+export interface SegmentMessage {
+  text: string;
+  start: number; // seconds from the start of the recording
+  end: number;
+  index: number;
+  updateKind: "segment";
+}
+
 export type MessageType =
   | ProgressMessage
   | ExceptionMessage
@@ -60,7 +76,8 @@ export type MessageType =
   | ErrorMessage
   | StatusMessage
   | ResultMessage
-  | TranscriptionMessage;
+  | TranscriptionMessage
+  | SegmentMessage;
 
 /**
  * A message from the Python process to the Electron process that was not explicitly requested.
@@ -216,6 +216,9 @@ export class PythonService extends EventEmitter {
             message.transcription,
           );
           break;
+        case "segment":
+          this.emitPythonEvent(PythonEvents.SEGMENT, message);
+          break;
         default:
           // eslint-disable-next-line no-case-declarations
           const _exhaustiveCheck: never = message;